@@ -0,0 +1,257 @@
+import argparse
+import ast
+import importlib
+import json
+import platform
+import random
+import subprocess
+import time
+
+import chess
+
+# Measures search and evaluation speed so changes can be compared, e.g.
+#
+#   python Benchmark.py --output before.json
+#   ...change something...
+#   python Benchmark.py --compare before.json
+#
+# "perft" counts move generation nodes on positions with known totals,
+# "bench" runs a fixed depth search over BENCH_FENS and prints the total
+# node count as a signature (it only changes when the search changes),
+# and "eval" times evaluate() and main_eval() per call. "profile" is only
+# run when asked for: it repeats the bench searches with the evaluation
+# profiler on and reports where evaluate() spends its time.
+
+PERFT_POSITIONS = [
+    # fen, depth, expected nodes
+    (chess.STARTING_FEN, 4, 197281),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+]
+
+BENCH_FENS = [
+    chess.STARTING_FEN,
+    "r3k2r/2pb1ppp/2pp1q2/p7/1nP1B3/1P2P3/P2N1PPP/R2QK2R w KQkq a6 0 14",
+    "4rrk1/2p1b1p1/p1p3q1/4p3/2P2n1p/1P1NR2P/PB3PP1/3R1QK1 b - - 2 24",
+    "r3qbrk/6p1/2b2pPp/p3pP1Q/PpPpP2P/3P1B2/2PB3K/R5R1 w - - 16 42",
+    "6k1/1R3p2/6p1/2Bp3p/3P2q1/P7/1P2rQ1K/5R2 b - - 4 44",
+    "8/8/1p2k1p1/3p3p/1p1P1P1P/1P2PK2/8/8 w - - 3 54",
+    "7r/2p3k1/1p1p1qp1/1P1Bp3/p1P2r1P/P7/4R3/Q4RK1 w - - 0 36",
+    "r1bq1rk1/pp2b1pp/n1pp1n2/3P1p2/2P1p3/2N1P2N/PP2BPPP/R1BQ1RK1 b - - 2 10",
+    "3r3k/2r4p/1p1b3q/p4P2/P2Pp3/1B2P3/3BQ1RP/6K1 w - - 3 87",
+    "2r4r/1p4k1/1Pnp4/3Qb1pq/8/4BpPp/5P2/2RR1BK1 w - - 0 42",
+    "4q1bk/6b1/7p/p1p4p/PNPpP2P/KN4P1/3Q4/4R3 b - - 0 37",
+    "2q3r1/1r2pk2/pp3pp1/2pP3p/P1Pb1BbP/1P4Q1/R3NPP1/4R1K1 w - - 2 34",
+    "1r2r2k/1b4q1/pp5p/2pPp1p1/P3Pn2/1P1B1Q1P/2R3P1/4BR1K b - - 1 37",
+    "r3kbbr/pp1n1p1P/3ppnp1/q5N1/1P1pP3/P1N1B3/2P1QP2/R3KB1R b KQkq b3 0 17",
+    "8/6pk/2b1Rp2/3r4/1R1B2PP/P5K1/8/2r5 b - - 16 42",
+    "1r4k1/4ppb1/2n1b1qp/pB4p1/1n1BP1P1/7P/2PNQPK1/3RN3 w - - 8 29",
+    "8/p2B4/PkP5/4p1pK/4Pb1p/5P2/8/8 w - - 29 68",
+    "3r4/ppq1ppkp/4bnp1/2pN4/2P1P3/1P4P1/PQ3PBP/R4K2 b - - 2 20",
+    "5rr1/4n2k/4q2P/P1P2n2/3B1p2/4pP2/2N1P3/1RR1K2Q w - - 1 49",
+    "1r5k/2pq2p1/3p3p/p1pP4/4QP2/PP1R3P/6PK/8 w - - 1 51",
+    "q5k1/5ppp/1r3bn1/1B6/P1N2P2/BQ2P1P1/5K1P/8 b - - 2 34",
+    "r1b2k1r/5n2/p4q2/1ppn1Pp1/3pp1p1/NP2P3/P1PPBK2/1RQN2R1 b - - 0 22",
+    "r1bqk2r/pppp1ppp/5n2/4b3/4P3/P1N5/1PP2PPP/R1BQKB1R w KQkq - 0 5",
+    "r1bqr1k1/pp1p1ppp/2p5/8/3N1Q2/P2BB3/1PP2PPP/R3K2n b Q - 1 12",
+    "r1bq2k1/p4r1p/1pp2pp1/3p4/1P1B3Q/P2B1N2/2P3PP/4R1K1 b - - 2 19",
+    "r4qk1/6r1/1p4p1/2ppBbN1/1p5Q/P7/2P3PP/5RK1 w - - 2 25",
+    "r7/6k1/1p6/2pp1p2/7Q/8/p1P2K1P/8 w - - 0 32",
+    "r3k2r/ppp1pp1p/2nqb1pn/3p4/4P3/2PP4/PP1NBPPP/R2QK1NR w KQkq - 1 5",
+    "3r1rk1/1pp1pn1p/p1n1q1p1/3p4/Q3P3/2P5/PP1NBPPP/4RRK1 w - - 0 12",
+    "5rk1/1pp1pn1p/p3Brp1/8/1n6/5N2/PP3PPP/2R2RK1 w - - 2 20",
+    "8/1p2pk1p/p1p1r1p1/3n4/8/5R2/PP3PPP/4R1K1 b - - 3 27",
+    "8/4pk2/1p1r2p1/p1p4p/Pn5P/3R4/1P3PP1/4RK2 w - - 1 33",
+    "8/5k2/1pnrp1p1/p1p4p/P6P/4R1PK/1P3P2/4R3 b - - 1 38",
+    "8/8/1p1kp1p1/p1pr1n1p/P6P/1R4P1/1P3PK1/1R6 b - - 15 45",
+    "8/8/1p1k2p1/p1prp2p/P2n3P/6P1/1P1R1PK1/4R3 b - - 5 49",
+    "8/8/1p4p1/p1p2k1p/P2npP1P/4K1P1/1P6/3R4 w - - 6 54",
+    "8/5k2/1p4p1/p1pK3p/P2n1P1P/6P1/1P6/4R3 b - - 14 63",
+    "8/1R6/1p1K1kp1/p6p/P1p2P1P/6P1/1Pn5/8 w - - 0 67",
+    "1rb1rn1k/p3q1bp/2p3p1/2p1p3/2P1P2N/PN3P2/1P1Q1BPP/1R3RK1 b - - 3 19",
+    "r2qkb1r/pp1n1ppp/2p1pn2/3p4/2PP4/2N1PN2/PP3PPP/R1BQKB1R w KQkq - 0 6",
+]
+
+def load_bot_class(module_name):
+    return importlib.import_module(f"bots.{module_name}").Bot
+
+def perft(board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def run_perft():
+    results = []
+    for fen, depth, expected in PERFT_POSITIONS:
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        nodes = perft(board, depth)
+        seconds = time.perf_counter() - start
+        results.append({
+            "fen": fen, "depth": depth, "nodes": nodes, "expected": expected,
+            "correct": nodes == expected, "seconds": seconds, "nps": nodes / seconds,
+        })
+        print(f"perft {depth} {'ok ' if nodes == expected else 'BAD'} {nodes:>9} nodes {nodes / seconds:>10.0f} nps  {fen}")
+
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    print(f"perft total: {nodes} nodes in {seconds:.2f}s, {nodes / seconds:.0f} nps")
+    return {"positions": results, "nodes": nodes, "seconds": seconds, "nps": nodes / seconds}
+
+def run_bench(bot_class, depth, options):
+    results = []
+    for fen in BENCH_FENS:
+        board = chess.Board(fen)
+        bot = bot_class(color=board.turn, depth=depth, **options)
+        # the search adds a little random noise to scores, fix it so node counts repeat
+        random.seed(0)
+        start = time.perf_counter()
+        score, best = bot.iterative_deepening(board, depth)
+        seconds = time.perf_counter() - start
+        move = best[0].uci() if best else None
+        results.append({"fen": fen, "nodes": bot.nodes, "seconds": seconds, "move": move})
+        print(f"bench {bot.nodes:>8} nodes {seconds:>7.2f}s  {move}  {fen}")
+
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    print(f"bench total: {nodes} nodes in {seconds:.2f}s, {nodes / seconds:.0f} nps, signature {nodes}")
+    return {"depth": depth, "positions": results, "nodes": nodes, "seconds": seconds,
+            "nps": nodes / seconds, "signature": nodes}
+
+def time_per_call(function, boards, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            function(board)
+    return (time.perf_counter() - start) / (repeat * len(boards)) * 1e6
+
+def run_eval(bot_class, options, repeat):
+    # every position one move away from the bench positions, so the cache sees each board once per pass
+    boards = []
+    for fen in BENCH_FENS:
+        board = chess.Board(fen)
+        for move in board.legal_moves:
+            child = board.copy(stack=False)
+            child.push(move)
+            boards.append(child)
+
+    results = {}
+    for color in chess.COLORS:
+        bot = bot_class(color=color, **options)
+        side = chess.COLOR_NAMES[color]
+
+        results[f"evaluate_us_{side}"] = time_per_call(bot.evaluate, boards, repeat)
+        # main_eval on a cleared cache measures hashing and storing, the passes after it only the lookup
+        bot.eval_cache.clear()
+        results[f"main_eval_cold_us_{side}"] = time_per_call(bot.main_eval, boards, 1)
+        results[f"main_eval_warm_us_{side}"] = time_per_call(bot.main_eval, boards, repeat)
+
+    for name, value in results.items():
+        print(f"{name:<24} {value:>9.1f} us")
+    return {"positions": len(boards), **results}
+
+def run_profile(bot_class, depth, options):
+    # the profiler belongs to the bot, so one bot searches all the positions
+    bot = bot_class(depth=depth, profile=True, **options)
+    random.seed(0)
+    for fen in BENCH_FENS:
+        board = chess.Board(fen)
+        bot.color = board.turn
+        bot.reset()
+        bot.iterative_deepening(board, depth)
+
+    print(bot.profiler.format_report())
+    return bot.profiler.report()
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, previous_path, tolerance):
+    """Print the change against an earlier JSON report and return False on a regression"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+
+    ok = True
+    print(f"\ncompared with {previous_path} ({previous.get('revision')}):")
+    for part, key in (("perft", "nps"), ("bench", "nps")):
+        if part in current and part in previous:
+            change = current[part][key] / previous[part][key] - 1
+            flag = "REGRESSION" if change < -tolerance else ""
+            ok &= not flag
+            print(f"  {part} {key}: {previous[part][key]:.0f} -> {current[part][key]:.0f} ({change:+.1%}) {flag}")
+    if "bench" in current and "bench" in previous:
+        same = current["bench"]["signature"] == previous["bench"]["signature"]
+        print(f"  bench signature: {previous['bench']['signature']} -> {current['bench']['signature']}"
+              f"{'' if same else ' (search changed)'}")
+    if "eval" in current and "eval" in previous:
+        for name, value in current["eval"].items():
+            if "_us" in name and name in previous["eval"]:
+                change = value / previous["eval"][name] - 1
+                flag = "REGRESSION" if change > tolerance else ""
+                ok &= not flag
+                print(f"  {name}: {previous['eval'][name]:.1f} -> {value:.1f} us ({change:+.1%}) {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark move generation, search and evaluation")
+    parser.add_argument("parts", nargs="*", help="any of perft, bench, eval and profile (default: perft, bench and eval)")
+    parser.add_argument("--bot", default="ComplexChessBot", help="bot module in bots/")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--hash-mb", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the positions for the eval timings")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="slowdown reported as a regression")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra bot constructor argument, e.g. --option lmr=True (repeatable)")
+    args = parser.parse_args()
+
+    parts = args.parts or ["perft", "bench", "eval"]
+    for part in parts:
+        if part not in ("perft", "bench", "eval", "profile"):
+            parser.error(f"unknown part {part!r}")
+    bot_class = load_bot_class(args.bot)
+    options = {"hash_mb": args.hash_mb}
+    for option in args.option:
+        name, _, value = option.partition("=")
+        try:
+            options[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[name] = value
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "chess": chess.__version__,
+        "bot": args.bot,
+        "options": options,
+    }
+    if "perft" in parts:
+        report["perft"] = run_perft()
+    if "bench" in parts:
+        report["bench"] = run_bench(bot_class, args.depth, options)
+    if "eval" in parts:
+        report["eval"] = run_eval(bot_class, options, args.repeat)
+    if "profile" in parts:
+        report["profile"] = run_profile(bot_class, args.depth, options)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
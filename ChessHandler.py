@@ -8,17 +8,18 @@ import bots.StalemateChessBot as StalemateChessBot
 
 Human = "human"
 
-white_bot = ComplexChessBot.Bot(color = chess.WHITE, depth=3)
-black_bot = ComplexChessBot.Bot(color = chess.BLACK, depth=3)
+if __name__ == "__main__":
+    white_bot = ComplexChessBot.Bot(color = chess.WHITE, depth=3)
+    black_bot = ComplexChessBot.Bot(color = chess.BLACK, depth=3)
 
-gui = chessGUI(white_player=white_bot, black_player=black_bot)
-gui.move_time = 100
+    gui = chessGUI(white_player=white_bot, black_player=black_bot)
+    gui.move_time = 100
 
 
-gui.run()
+    gui.run()
 
-pgn = chess.pgn.Game.from_board(gui.board)
-pgn.headers["White"] = "Human" if white_bot == Human else white_bot.name()
-pgn.headers["Black"] = "Human" if black_bot == Human else black_bot.name()
+    pgn = chess.pgn.Game.from_board(gui.board)
+    pgn.headers["White"] = "Human" if white_bot == Human else white_bot.name()
+    pgn.headers["Black"] = "Human" if black_bot == Human else black_bot.name()
 
-print(pgn)
+    print(pgn)
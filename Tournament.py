@@ -0,0 +1,163 @@
+import argparse
+import importlib
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chess
+import chess.pgn
+
+# Plays bot-vs-bot matches without the GUI, for example
+#
+#   python Tournament.py ComplexChessBot StalemateChessBot --games 100 --depth 2
+#
+# Bots are modules in bots/ that define a Bot class. Games are played in
+# pairs from the same random opening with colors swapped, spread over a
+# process pool, and written to the PGN file as soon as they finish.
+
+def load_bot(module_name, color, options):
+    module = importlib.import_module(f"bots.{module_name}")
+    return module.Bot(color=color, **options)
+
+def random_opening(plies, seed):
+    """A few random legal moves from the start position, the same for both games of a pair"""
+    rng = random.Random(seed)
+    board = chess.Board()
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+        if board.is_game_over():
+            board.pop()
+            break
+    return board.move_stack
+
+def play_game(index, first, second, options, opening, first_is_white, max_plies, seed):
+    """Play one game, returning (index, result for first, pgn text)"""
+    random.seed(seed)
+    white_name, black_name = (first, second) if first_is_white else (second, first)
+    white = load_bot(white_name, chess.WHITE, options)
+    black = load_bot(black_name, chess.BLACK, options)
+
+    board = chess.Board()
+    for move in opening:
+        board.push(move)
+
+    termination = None
+    while not board.is_game_over(claim_draw=True):
+        if len(board.move_stack) >= max_plies:
+            termination = "adjudication"
+            break
+        player = white if board.turn == chess.WHITE else black
+        move, _ = player.choose_move(board.copy())
+        if move is None or move not in board.legal_moves:
+            termination = "illegal move"
+            break
+        board.push(move)
+
+    if termination == "illegal move":
+        result = "0-1" if board.turn == chess.WHITE else "1-0"
+    elif termination == "adjudication":
+        result = "1/2-1/2"
+    else:
+        result = board.result(claim_draw=True)
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "Tournament"
+    game.headers["Round"] = str(index + 1)
+    game.headers["White"] = white.name()
+    game.headers["Black"] = black.name()
+    game.headers["Result"] = result
+    if termination:
+        game.headers["Termination"] = termination
+
+    score = {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5)
+    if not first_is_white:
+        score = 1.0 - score
+    return index, score, str(game)
+
+def elo_difference(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+def elo_report(wins, draws, losses):
+    """Elo difference of the first bot with a 95% error margin"""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, 0.0
+    score = (wins + draws / 2) / games
+    deviation = math.sqrt(
+        (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    ) / math.sqrt(games)
+    low = elo_difference(score - 1.96 * deviation)
+    high = elo_difference(score + 1.96 * deviation)
+    return elo_difference(score), (high - low) / 2
+
+def run_match(first, second, games=10, options=None, workers=None, pgn_path="tournament.pgn",
+              opening_plies=4, max_plies=300, seed=None):
+    options = options or {}
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    wins = draws = losses = 0
+    start = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(pgn_path, "w") as pgn_file:
+        futures = []
+        for index in range(games):
+            # games 2k and 2k+1 share an opening with colors swapped
+            opening = random_opening(opening_plies, seed + index // 2)
+            futures.append(pool.submit(
+                play_game, index, first, second, options, opening,
+                index % 2 == 0, max_plies, seed + index
+            ))
+
+        for future in as_completed(futures):
+            index, score, pgn = future.result()
+            pgn_file.write(pgn + "\n\n")
+            pgn_file.flush()
+
+            if score == 1.0:
+                wins += 1
+            elif score == 0.0:
+                losses += 1
+            else:
+                draws += 1
+
+            elo, margin = elo_report(wins, draws, losses)
+            print(f"game {index + 1}: {first} {score:g} | +{wins} ={draws} -{losses} | "
+                  f"elo {elo:+.1f} +/- {margin:.1f} | {time.time() - start:.0f}s", flush=True)
+
+    return wins, draws, losses
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a headless match between two bots")
+    parser.add_argument("first", help="bot module in bots/, e.g. ComplexChessBot")
+    parser.add_argument("second", help="bot module in bots/, e.g. StalemateChessBot")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pgn", default="tournament.pgn")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies played before the bots take over")
+    parser.add_argument("--max-plies", type=int, default=300, help="adjudicate a draw after this many plies")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--book", default=None, help="polyglot .bin opening book for both bots")
+    parser.add_argument("--cache", default=None, help="path prefix of a persistent search/eval cache shared by all games")
+    args = parser.parse_args()
+
+    options = {"depth": args.depth, "time_limit": args.time_limit, "book_path": args.book,
+               "cache_path": args.cache}
+    wins, draws, losses = run_match(
+        args.first, args.second, args.games, options, args.workers, args.pgn,
+        args.opening_plies, args.max_plies, args.seed
+    )
+
+    elo, margin = elo_report(wins, draws, losses)
+    print()
+    print(f"{args.first} vs {args.second}: +{wins} ={draws} -{losses}")
+    print(f"Elo difference: {elo:+.1f} +/- {margin:.1f} (95%)")
+
+if __name__ == "__main__":
+    main()
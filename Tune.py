@@ -0,0 +1,248 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import chess
+import chess.pgn
+import numpy as np
+
+import bots.ComplexChessBot as ComplexChessBot
+
+# Fits ComplexChessBot's evaluation modifiers to game results (Texel tuning):
+#
+#   python Tune.py extract tournament.pgn --output features.npz
+#   python Tune.py fit features.npz --output params.json
+#
+# extract runs once over a large file of labeled positions, spread over a
+# process pool, and keeps every position's raw evaluation features. fit
+# can then be run as often as needed: the evaluation is linear in its
+# modifiers, so the features turn into one column per modifier and every
+# gradient step is a few NumPy matrix products. The result is a parameter
+# file for ComplexChessBot.Bot(params_path = "params.json").
+#
+# Positions come from PGN games, labeled with the game's result, or from
+# text files with a FEN and a result per line ("1-0", "0-1", "1/2-1/2",
+# or a white score like [0.5]), as in the usual EPD training sets.
+
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+RESULT_PATTERN = re.compile(r'"?(1-0|0-1|1/2-1/2)"?|\[([01](?:\.\d+)?)\]')
+
+PARAM_NAMES = tuple(ComplexChessBot.DEFAULT_PARAMS)
+
+# ------------------ POSITIONS ------------------
+
+def parse_line(line):
+    """(fen, white score) from one line of a labeled position file, or None"""
+    match = RESULT_PATTERN.search(line)
+    if match is None:
+        return None
+    fields = line[:match.start()].replace(";", " ").split()
+    if len(fields) < 4:
+        return None
+    # EPD lines stop after the en passant square, opcodes like c9 follow
+    fen = " ".join(fields[:6] if len(fields) >= 6 and fields[4].isdigit() else fields[:4])
+    result = RESULTS[match.group(1)] if match.group(1) else float(match.group(2))
+    return fen, result
+
+def read_positions(path, skip_plies=8):
+    """Stream (fen, white score) pairs from a PGN file or a labeled position file"""
+    if path.endswith(".pgn"):
+        with open(path) as f:
+            while (game := chess.pgn.read_game(f)) is not None:
+                result = RESULTS.get(game.headers.get("Result"))
+                if result is None:
+                    continue  # unfinished game
+                board = game.board()
+                # the opening is book moves or random plies, they say little about the result
+                for ply, move in enumerate(game.mainline_moves()):
+                    board.push(move)
+                    if ply + 1 >= skip_plies:
+                        yield board.fen(), result
+    else:
+        with open(path) as f:
+            for line in f:
+                parsed = parse_line(line)
+                if parsed is not None:
+                    yield parsed
+
+# ------------------ EXTRACTION ------------------
+# Every position gives two rows, one evaluated by a White bot and one by a
+# Black bot, because the features are from the bot's own point of view.
+
+_bots = None
+
+def _init_worker():
+    global _bots
+    _bots = [ComplexChessBot.Bot(color=color, hash_mb=1, stats=False) for color in (chess.WHITE, chess.BLACK)]
+
+def extract_chunk(chunk):
+    """Feature rows and the matching results of a list of (fen, white score) pairs"""
+    rows = []
+    results = []
+    for fen, result in chunk:
+        try:
+            board = chess.Board(fen)
+        except ValueError:
+            continue
+        # checkmates score infinitely, and the static evaluation of a position in check says little
+        if not board.is_valid() or board.is_check():
+            continue
+        for bot in _bots:
+            rows.append(bot.features(board))
+            results.append(result if bot.color == chess.WHITE else 1 - result)
+    return np.array(rows, dtype=np.float64).reshape(-1, len(ComplexChessBot.FEATURES)), np.array(results)
+
+def extract(paths, output, workers, chunk_size=2000, skip_plies=8):
+    """Extract the features of every position in paths into an .npz file, returning the number of rows"""
+    positions = itertools.chain.from_iterable(read_positions(path, skip_plies) for path in paths)
+    chunks = iter(lambda: list(itertools.islice(positions, chunk_size)), [])
+
+    features = []
+    results = []
+    start = time.time()
+
+    def collect(done):
+        for future in done:
+            rows, labels = future.result()
+            features.append(rows)
+            results.append(labels)
+        rows_done = sum(len(labels) for labels in results)
+        print(f"\r{rows_done} rows, {time.time() - start:.1f}s", end="", flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # only a few chunks in flight, so the file is never read into memory whole
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(extract_chunk, chunk))
+        collect(wait(pending).done)
+    print()
+
+    features = np.concatenate(features) if features else np.empty((0, len(ComplexChessBot.FEATURES)))
+    results = np.concatenate(results) if results else np.empty(0)
+    np.savez_compressed(output, features=features, results=results)
+    return len(results)
+
+# ------------------ FITTING ------------------
+
+def scores(bot, columns, params):
+    """ComplexChessBot's evaluation of every row, from the feature columns"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = sum(bot.term_scores(columns, np.minimum, np.maximum, params))
+    return np.where(columns[ComplexChessBot.DRAWISH] != 0, -total / 8, total)
+
+def linear_form(features):
+    """Split the evaluation into score = base + basis @ modifiers, with a basis column per parameter"""
+    bot = ComplexChessBot.Bot(hash_mb=1, stats=False)
+    columns = features.T
+    zero = dict.fromkeys(PARAM_NAMES, 0.0)
+    base = scores(bot, columns, zero)
+    basis = np.empty((len(base), len(PARAM_NAMES)))
+    for j, name in enumerate(PARAM_NAMES):
+        basis[:, j] = scores(bot, columns, {**zero, name: 1.0}) - base
+    return base, basis
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def loss(base, basis, results, weights, k):
+    """Mean squared error between the results and the scores mapped to expected results"""
+    return float(np.mean((results - sigmoid(k * (base + basis @ weights))) ** 2))
+
+def fit_k(base, basis, results, weights):
+    """Scale from evaluation units to expected result that suits the current parameters best"""
+    candidates = np.geomspace(0.01, 10, 300)
+    errors = [loss(base, basis, results, weights, k) for k in candidates]
+    return float(candidates[int(np.argmin(errors))])
+
+def fit(base, basis, results, weights, k, epochs=2000, learning_rate=0.01):
+    """Full-batch Adam on the modifiers, each scaled by its basis column's spread so one rate suits them all"""
+    scale = basis.std(axis=0)
+    scale[scale == 0] = 1
+    scaled = basis / scale
+    u = weights * scale
+    m = np.zeros_like(u)
+    v = np.zeros_like(u)
+    beta1, beta2 = 0.9, 0.999
+
+    for step in range(1, epochs + 1):
+        predicted = sigmoid(k * (base + scaled @ u))
+        error = predicted - results
+        gradient = scaled.T @ (error * predicted * (1 - predicted)) * (2 * k / len(results))
+
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        u -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-12)
+
+    return u / scale
+
+def write_params(path, params, k, error, rows):
+    with open(path, "w") as f:
+        json.dump({"params": params, "k": k, "loss": error, "rows": rows}, f, indent=2)
+        f.write("\n")
+
+def run_fit(data_path, output, epochs, learning_rate, validation, seed):
+    data = np.load(data_path)
+    features, results = data["features"], data["results"]
+    finite = np.isfinite(features).all(axis=1)
+    features, results = features[finite], results[finite]
+
+    base, basis = linear_form(features)
+    # hold out a share of the rows to check the fit generalizes
+    order = np.random.default_rng(seed).permutation(len(results))
+    held = order[:int(len(results) * validation)]
+    train = order[len(held):]
+
+    weights = np.array([ComplexChessBot.DEFAULT_PARAMS[name] for name in PARAM_NAMES])
+    k = fit_k(base[train], basis[train], results[train], weights)
+    before = loss(base[train], basis[train], results[train], weights, k)
+    held_before = loss(base[held], basis[held], results[held], weights, k) if len(held) else None
+
+    fitted = fit(base[train], basis[train], results[train], weights, k, epochs, learning_rate)
+    after = loss(base[train], basis[train], results[train], fitted, k)
+    held_after = loss(base[held], basis[held], results[held], fitted, k) if len(held) else None
+
+    print(f"{len(train)} training rows, {len(held)} held out, k = {k:.4f}")
+    print(f"loss {before:.6f} -> {after:.6f}" + (f", held out {held_before:.6f} -> {held_after:.6f}" if len(held) else ""))
+    unused = basis.std(axis=0) == 0
+    for name, old, new, dead in zip(PARAM_NAMES, weights, fitted, unused):
+        # a modifier whose term is constant over the data can't be fitted
+        print(f"  {name:<26} {old:>10.5f} -> {new:>10.5f}" + ("  (no effect on these positions)" if dead else ""))
+
+    params = {name: float(value) for name, value in zip(PARAM_NAMES, fitted)}
+    write_params(output, params, k, after, len(train))
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit ComplexChessBot's evaluation modifiers to game results")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = commands.add_parser("extract", help="extract evaluation features from labeled positions")
+    extract_parser.add_argument("positions", nargs="+", help="PGN files or files with a FEN and a result per line")
+    extract_parser.add_argument("--output", default="features.npz")
+    extract_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    extract_parser.add_argument("--chunk-size", type=int, default=2000, help="positions per task")
+    extract_parser.add_argument("--skip-plies", type=int, default=8, help="opening plies of PGN games left out")
+
+    fit_parser = commands.add_parser("fit", help="fit the modifiers to extracted features")
+    fit_parser.add_argument("features", help=".npz file written by extract")
+    fit_parser.add_argument("--output", default="params.json")
+    fit_parser.add_argument("--epochs", type=int, default=2000)
+    fit_parser.add_argument("--learning-rate", type=float, default=0.01)
+    fit_parser.add_argument("--validation", type=float, default=0.1, help="share of rows held out")
+    fit_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "extract":
+        rows = extract(args.positions, args.output, args.workers, args.chunk_size, args.skip_plies)
+        print(f"{rows} rows written to {args.output}")
+    else:
+        run_fit(args.features, args.output, args.epochs, args.learning_rate, args.validation, args.seed)
+
+if __name__ == "__main__":
+    main()
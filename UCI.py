@@ -0,0 +1,200 @@
+import argparse
+import importlib
+import math
+import sys
+import threading
+
+import chess
+
+from base.ChessBotBase import MAX_DEPTH
+
+# Runs a bot as a UCI engine, for match managers and analysis GUIs, e.g.
+#
+#   python UCI.py ComplexChessBot
+#
+# The main thread keeps reading stdin while a search runs in its own
+# thread, so "stop" and "isready" are answered straight away. Scores are
+# relative to each bot's color, so the engine keeps one bot per side.
+
+OPTIONS = {
+    "Hash": ("spin", 16, 1, 4096),
+    "Threads": ("spin", 1, 1, 64),
+}
+
+class Engine:
+    def __init__(self, module_name, depth, output=sys.stdout):
+        self.module = importlib.import_module(f"bots.{module_name}")
+        self.depth = depth
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.options = {name: default for name, (_, default, _, _) in OPTIONS.items()}
+        self.board = chess.Board()
+        self.bots = None
+        self.search_thread = None
+        self.stop = threading.Event()
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def make_bots(self):
+        """One bot per side, built lazily so setoption can come first"""
+        if self.bots is None:
+            self.bots = {
+                color: self.module.Bot(
+                    color=color, depth=self.depth,
+                    hash_mb=self.options["Hash"], threads=self.options["Threads"]
+                )
+                for color in chess.COLORS
+            }
+            for bot in self.bots.values():
+                bot.add_listener(self.on_info)
+        return self.bots
+
+    def close_bots(self):
+        if self.bots is not None:
+            for bot in self.bots.values():
+                bot.close()
+            self.bots = None
+
+    def on_info(self, info):
+        score = info["score"]
+        if score is None:
+            score_text = "cp 0"
+        elif math.isinf(score):
+            # mate scores carry no distance, the PV is the best guess at it
+            moves = max(1, (len(info["pv"]) + 1) // 2)
+            score_text = f"mate {moves if score > 0 else -moves}"
+        else:
+            score_text = f"cp {int(score * 100)}"
+        self.send(
+            f"info depth {info['depth']} score {score_text} nodes {info['nodes']} nps {info['nps']} "
+            f"time {int(info['time'] * 1000)} pv {' '.join(info['pv'])}"
+        )
+
+    # ------------------ COMMANDS ------------------
+
+    def uci(self, args):
+        bot_name = self.module.Bot(hash_mb=1).name()
+        self.send(f"id name {bot_name}")
+        self.send("id author Chess Handler")
+        for name, (kind, default, low, high) in OPTIONS.items():
+            self.send(f"option name {name} type {kind} default {default} min {low} max {high}")
+        self.send("uciok")
+
+    def isready(self, args):
+        self.make_bots()
+        self.send("readyok")
+
+    def setoption(self, args):
+        # setoption name <name> value <value>
+        if "name" not in args:
+            return
+        value_at = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_at])
+        value = " ".join(args[value_at + 1:])
+        for option, (kind, _, low, high) in OPTIONS.items():
+            if option.lower() == name.lower():
+                try:
+                    self.options[option] = min(max(int(value), low), high)
+                except ValueError:
+                    return
+                self.wait_for_search()
+                self.close_bots()
+
+    def ucinewgame(self, args):
+        self.wait_for_search()
+        if self.bots is not None:
+            for bot in self.bots.values():
+                bot.reset()
+
+    def position(self, args):
+        # position [startpos | fen <fen>] [moves <move> ...]
+        moves_at = args.index("moves") if "moves" in args else len(args)
+        if args and args[0] == "fen":
+            board = chess.Board(" ".join(args[1:moves_at]))
+        else:
+            board = chess.Board()
+        for uci in args[moves_at + 1:]:
+            board.push_uci(uci)
+        self.board = board
+
+    def go(self, args):
+        self.wait_for_search()
+
+        params = {}
+        for i, word in enumerate(args):
+            if word in ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "nodes") and i + 1 < len(args):
+                params[word] = int(args[i + 1])
+
+        bot = self.make_bots()[self.board.turn]
+        depth = params.get("depth")
+        time_limit = None
+        node_limit = params.get("nodes")
+        if "movetime" in params:
+            time_limit = params["movetime"] / 1000
+        elif "wtime" in params or "btime" in params:
+            time_limit = bot.allocate_time(
+                params.get("wtime", 0) / 1000, params.get("btime", 0) / 1000,
+                params.get("winc", 0) / 1000, params.get("binc", 0) / 1000, params.get("movestogo")
+            )
+        if "infinite" in args:
+            depth = MAX_DEPTH
+
+        self.stop = threading.Event()
+        self.search_thread = threading.Thread(
+            target=self.search, args=(bot, self.board.copy(), depth, time_limit, node_limit, self.stop, "infinite" in args),
+            daemon=True
+        )
+        self.search_thread.start()
+
+    def search(self, bot, board, depth, time_limit, node_limit, stop, infinite):
+        # every go is a new search with its own limits, even for a position played before
+        move, _ = bot.choose_move(board, depth, time_limit, node_limit, stop=stop, memo=False)
+        if infinite:
+            # the protocol only allows bestmove after stop
+            stop.wait()
+        self.send(f"bestmove {move.uci() if move is not None else '0000'}")
+
+    def wait_for_search(self):
+        if self.search_thread is not None:
+            self.stop.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def handle(self, line):
+        """Run one command line; returns False on quit"""
+        words = line.split()
+        if not words:
+            return True
+        command, args = words[0], words[1:]
+        if command == "quit":
+            self.wait_for_search()
+            self.close_bots()
+            return False
+        if command == "stop":
+            self.wait_for_search()
+        elif command == "ponderhit":
+            pass
+        elif command in ("uci", "isready", "setoption", "ucinewgame", "position", "go"):
+            getattr(self, command)(args)
+        return True
+
+    def run(self, lines=sys.stdin):
+        for line in lines:
+            if not self.handle(line):
+                return
+        # stdin closed
+        self.wait_for_search()
+        self.close_bots()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a bot as a UCI engine")
+    parser.add_argument("bot", nargs="?", default="ComplexChessBot", help="bot module in bots/")
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH, help="depth of a go command without limits")
+    args = parser.parse_args()
+    Engine(args.bot, args.depth).run()
+
+if __name__ == "__main__":
+    main()
@@ -3,38 +3,317 @@ import chess
 import chess.polyglot
 import random
 import math
-from concurrent.futures import ThreadPoolExecutor
+import time
+import threading
+import multiprocessing
+import itertools
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+from base.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER, pack_move, unpack_move
+from base.Zobrist import ZobristStack
+from base.SearchStats import SearchStats
+from base.OpeningBook import OpeningBook
+from base.Tablebase import Tablebase, TB_WIN
+from base.PersistentTable import PersistentTable
+
+MAX_DEPTH = 64
+MAX_PLY = 128
+
+# most children scored per evaluate_batch call at the last ply. Batches start
+# at one move and double, so an early cutoff still skips most evaluations.
+LEAF_BATCH = 32
+
+# piece values for MVV-LVA ordering and static exchange evaluation, indexed by piece type
+ORDER_VALUES = [0, 1, 3, 3, 5, 9, 20]
+
+# move ordering bands: hash move, then captures/promotions, then killers, then history
+TT_MOVE_SCORE = 10000000
+CAPTURE_SCORE = 1000000
+KILLER_SCORE = 900000
+HISTORY_MAX = 500000
+
+# packed move records in the per-ply move buffers: the move in bits 0-14 as
+# in TranspositionTable.pack_move, bit 15 set for captures and promotions,
+# bits 16-23 counting down in generation order to break ties, and the
+# ordering score above, so the best record is the largest
+MOVE_BITS = 32767
+NOISY = 1 << 15
+ORDER_SHIFT = 16
+SCORE_SHIFT = 24
+MAX_MOVES = 256
+
+# one chess.Move per packed move, shared by every search
+MOVE_CACHE = [None] * 32768
+
+def cached_move(packed):
+    move = MOVE_CACHE[packed]
+    if move is None:
+        move = MOVE_CACHE[packed] = unpack_move(packed)
+    return move
+
+def pick_move(buffer, start, count):
+    """Swap the largest record of buffer[start:count] to start and return it; cheaper than sorting when a cutoff comes early"""
+    best = start
+    best_record = buffer[start]
+    for i in range(start + 1, count):
+        if buffer[i] > best_record:
+            best = i
+            best_record = buffer[i]
+    buffer[best] = buffer[start]
+    buffer[start] = best_record
+    return best_record
+
+# selective search: null move depth reduction, the width of the null window,
+# moves searched in full before late move reductions start, and the margins
+# (in evaluation units, about a pawn each) for futility pruning and razoring
+NULL_MOVE_R = 2
+NULL_WINDOW = 1e-6
+LMR_MOVES = 3
+FUTILITY_MARGIN = 1.0
+RAZOR_MARGIN = 2.0
+
+# aspiration windows: half width of the first root window around the previous
+# iteration's score, widened fourfold on each fail until it passes the maximum
+ASPIRATION_WINDOW = 0.5
+ASPIRATION_MAX = 8.0
+
+# quiescence delta pruning: a capture is skipped when even winning the piece
+# and this much more (in evaluation units) leaves the score below alpha
+DELTA_MARGIN = 2.0
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+# ------------------ PARALLEL ROOT SEARCH ------------------
+# Worker processes get their own copy of the bot once, through the pool
+# initializer, plus a shared bound. Every root move handed to a worker is
+# searched with the best score its siblings have already proven, and a
+# worker that beats that score publishes it for the others.
+
+_worker_bot = None
+_worker_bound = None
+# [search id, nodes spent on it] of the worker's share of a node budget
+_worker_budget = None
+_search_ids = itertools.count()
+
+def _init_worker(bot, bound, stop):
+    global _worker_bot, _worker_bound
+    _worker_bot = bot
+    _worker_bound = bound
+    # the parent sets this event to cancel the root moves still being searched
+    bot._stop = stop
+
+def _search_root_move(board, move, depth, deadline, search_id=None, node_share=None):
+    """(score or None if aborted, whether the score only fails low, nodes, stats counters)"""
+    global _worker_budget
+    bound = _worker_bound.value
+    bot = _worker_bot
+    bot.nodes = 0
+    bot._deadline = deadline
+    bot._node_limit = None
+    if node_share is not None:
+        # every root move this worker searches for one search draws on the same share
+        if _worker_budget is None or _worker_budget[0] != search_id:
+            _worker_budget = [search_id, 0]
+        bot._node_limit = node_share - _worker_budget[1]
+    bot.hashes.reset(board)
+    bot.root_ply = len(board.move_stack)
+    if bot.stats is not None:
+        bot.stats.start_search()
+    bot.push(board, move)
+    try:
+        if bot._node_limit is not None and bot._node_limit <= 0:
+            raise SearchAborted
+        # only a score above the best one so far matters
+        score = -bot.negamax(board, depth - 1, -1e9, -bound)[0]
+    except SearchAborted:
+        score = None
+    if node_share is not None:
+        _worker_budget[1] += bot.nodes
+
+    # at or below the bound the score is only an upper bound, the move is refuted
+    fail_low = score is not None and score <= bound
+    if score is not None and not fail_low:
+        with _worker_bound.get_lock():
+            if score > _worker_bound.value:
+                _worker_bound.value = score
+    return score, fail_low, bot.nodes, bot.stats.counters() if bot.stats is not None else None
 
 class Bot:
-    def __init__(self, color=chess.BLACK, depth=2, qsearch=False, qdepth=4):
+    def __init__(self, color=chess.BLACK, depth=2, qsearch=False, qdepth=4, threads=1, hash_mb=16,
+                 time_limit=None, node_limit=None, batch_leaves=False, stats=True, book_path=None,
+                 syzygy_path=None, syzygy_pieces=5, syzygy_cache=65536, cache_path=None,
+                 ponder=False, null_move=False, lmr=False, futility=False):
         self.color = color
         self.depth = depth
         self.qsearch = qsearch
         self.qdepth = qdepth
+        self.threads = threads
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        # score all children of the last ply together through evaluate_batch
+        self.batch_leaves = batch_leaves
+        # selective search switches, see negamax
+        self.null_move = null_move
+        self.lmr = lmr
+        self.futility = futility
         self.turn = 0
-        self.transposition_table = {}
+        self.transposition_table = TranspositionTable(hash_mb)
+        self.eval_cache = TranspositionTable(max(1, hash_mb // 4))
+        self.hashes = ZobristStack()
         self.past_moves_hash = {}
         self.resigns = False
+        # polyglot .bin book used by openning(), None plays without one
+        self.book = OpeningBook(book_path) if book_path else None
+        # Syzygy tables for positions with at most syzygy_pieces pieces, None searches them normally
+        self.tablebase = Tablebase(syzygy_path, syzygy_pieces, syzygy_cache) if syzygy_path else None
+        self._pool = None
+        self._bound = None
+
+        self.nodes = 0
+        self.depth_reached = 0
+        self._deadline = None
+        self._node_limit = None
+
+        # move ordering state
+        self.root_ply = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096, [0] * 4096]
+        # a move buffer per ply, filled by generate_moves
+        self.move_buffers = [array("q", bytes(8 * MAX_MOVES)) for _ in range(MAX_PLY)]
+
+        self._leaf_batch = []
+
+        # per-search statistics (None switches the counters off) and info subscribers
+        self.stats = SearchStats() if stats else None
+        self.listeners = []
+
+        # search the expected reply on the opponent's time, see start_pondering
+        self.ponder = ponder
+        self._ponder_thread = None
+        self._ponder_key = None
+        self._ponder_stop = None
+
+        # stop token of the running search, see choose_move
+        self._stop = None
+        self._pool_stop = None
+
+        # keep both tables in files shared across games and processes, see PersistentTable
+        self.cache_path = cache_path
+        if cache_path:
+            version = self.cache_version()
+            self.transposition_table = PersistentTable(f"{cache_path}.tt", hash_mb, version)
+            self.eval_cache = PersistentTable(f"{cache_path}.eval", max(1, hash_mb // 4), version)
+
+    def __getstate__(self):
+        # the pool, the shared bound and the subscribers belong to the parent process only
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["_bound"] = None
+        state["listeners"] = []
+        state["_ponder_thread"] = None
+        state["_ponder_stop"] = None
+        state["_stop"] = None
+        state["_pool_stop"] = None
+        return state
+
+    def add_listener(self, callback):
+        """Call callback(info) after every completed iteration, see SearchStats.iteration for the fields"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
 
     def name(self):
         return f"Chess Bot (depth {self.depth})"
 
+    def cache_version(self):
+        """Everything that changes this bot's scores; persistent cache entries are only shared between equal versions"""
+        return (
+            f"{type(self).__module__}.{type(self).__qualname__}|{self.name()}|"
+            f"color={self.color}|qsearch={self.qsearch}|qdepth={self.qdepth}|"
+            f"null_move={self.null_move}|lmr={self.lmr}|futility={self.futility}|"
+            f"syzygy={self.tablebase.max_pieces if self.tablebase is not None else None}"
+        )
+
     def evaluate(self, board):
         raise NotImplementedError
 
     def openning(self, board):
-        return None
+        """A book move for board, or None to search"""
+        if self.book is None:
+            return None
+        return self.book.choose(board)
+
+    def push(self, board, move):
+        """Play a move during search, keeping the Zobrist key up to date"""
+        return self.hashes.push(board, move)
+
+    def pop(self, board):
+        return self.hashes.pop(board)
+
+    def board_hash(self, board):
+        return self.hashes.key(board)
 
     def main_eval(self, board):
-        h = chess.polyglot.zobrist_hash(board)
-        if h in self.transposition_table:
-            return self.transposition_table[h] + random.random() / 1000
+        h = self.board_hash(board)
+        entry = self.eval_cache.probe(h)
+        if entry is not None:
+            return entry[1] + random.random() / 1000
+        elif self.stats is not None:
+            start = time.perf_counter()
+            score = self.evaluate(board)
+            self.stats.eval_time += time.perf_counter() - start
+            self.stats.eval_calls += 1
+            self.eval_cache.store(h, 0, score, EXACT)
         else:
             score = self.evaluate(board)
-            self.transposition_table[h] = score
+            self.eval_cache.store(h, 0, score, EXACT)
         return score + random.random() / 1000
 
+    def collect_leaf(self, board):
+        """Queue a leaf for evaluate_batch; override together with evaluate_batch to score leaves in bulk"""
+        self._leaf_batch.append(self.evaluate(board))
+
+    def evaluate_batch(self):
+        """Scores of the leaves queued by collect_leaf, in order"""
+        scores = self._leaf_batch
+        self._leaf_batch = []
+        return scores
+
+    def evaluate_children(self, board, moves):
+        """main_eval of the position after each move, with the uncached ones scored as one batch"""
+        scores = [None] * len(moves)
+        pending = []
+
+        for i, move in enumerate(moves):
+            self.push(board, move)
+            h = self.board_hash(board)
+            entry = self.eval_cache.probe(h)
+            if entry is not None:
+                scores[i] = entry[1]
+            else:
+                pending.append((i, h))
+                self.collect_leaf(board)
+            self.pop(board)
+
+        if self.stats is not None:
+            start = time.perf_counter()
+            batch = self.evaluate_batch()
+            self.stats.eval_time += time.perf_counter() - start
+            self.stats.eval_calls += len(batch)
+        else:
+            batch = self.evaluate_batch()
+
+        for (i, h), score in zip(pending, batch):
+            self.eval_cache.store(h, 0, score, EXACT)
+            scores[i] = score
+
+        return [score + random.random() / 1000 for score in scores]
+
     def all_moves(self, board):
+        """Every legal move as a (move, is_nudge) tuple; the search itself generates packed records with generate_moves"""
         moves = []
 
         for move in board.legal_moves:
@@ -42,92 +321,393 @@ class Bot:
 
         return moves
 
+    def generate_moves(self, board, ply, tt_move=None):
+        """Fill the ply's move buffer with packed records of board's legal moves and return their number.
+
+        The records' scores order them: hash move, MVV-LVA captures and
+        promotions, killers, then history.
+        """
+        buffer = self.move_buffers[ply]
+        tt_packed = pack_move(tt_move)
+        killer_1, killer_2 = (pack_move(killer) for killer in self.killers[ply])
+        history = self.history[board.turn]
+        them = board.occupied_co[not board.turn]
+        ep_square = board.ep_square
+        pawns = board.pawns
+        piece_type_at = board.piece_type_at
+
+        count = 0
+        for move in board.generate_legal_moves():
+            from_square = move.from_square
+            to_square = move.to_square
+            promotion = move.promotion
+            packed = from_square | (to_square << 6) | ((promotion or 0) << 12)
+
+            if packed == tt_packed:
+                score = TT_MOVE_SCORE
+                if them & chess.BB_SQUARES[to_square] or promotion:
+                    packed |= NOISY
+            elif them & chess.BB_SQUARES[to_square] or (to_square == ep_square and pawns & chess.BB_SQUARES[from_square]):
+                # en passant leaves the target square empty, the victim is a pawn
+                victim = piece_type_at(to_square) or chess.PAWN
+                score = CAPTURE_SCORE + 10 * ORDER_VALUES[victim] - ORDER_VALUES[piece_type_at(from_square)] + 10 * ORDER_VALUES[promotion or 0]
+                packed |= NOISY
+            elif promotion:
+                score = CAPTURE_SCORE + 10 * ORDER_VALUES[promotion]
+                packed |= NOISY
+            elif packed == killer_1:
+                score = KILLER_SCORE + 1
+            elif packed == killer_2:
+                score = KILLER_SCORE
+            else:
+                score = history[from_square * 64 + to_square]
+
+            buffer[count] = (score << SCORE_SHIFT) | ((MAX_MOVES - 1 - count) << ORDER_SHIFT) | packed
+            count += 1
+        return count
+
+    # ------------------ SEARCH ------------------
+    # negamax() is the search itself, with scores from the side to move's
+    # point of view like quiescence() and the transposition table. minimax()
+    # keeps the older interface, with scores from self.color's point of view.
+
     def minimax(self, board, depth=None, alpha=-1e9, beta=1e9, maximizing=None):
+        """Search board with scores from self.color's point of view, maximizing on self.color's moves"""
         if depth is None:
             depth = self.depth
         if maximizing is None:
             maximizing = board.turn == self.color
-
-        # Terminal node
-        if depth == 0:
+        # board is the root: plies index the move buffers from here
+        self.root_ply = len(board.move_stack)
+        self.hashes.reset(board)
+        if maximizing:
+            return self.negamax(board, depth, alpha, beta)
+        score, best_move = self.negamax(board, depth, -beta, -alpha)
+        return -score, best_move
+
+    def negamax(self, board, depth, alpha=-1e9, beta=1e9):
+        """Principal variation search: (score for the side to move, (move, is_nudge) or None)"""
+        self.nodes += 1
+        if self.nodes & 63 == 0:
+            self.check_limits()
+
+        ply = len(board.move_stack) - self.root_ply
+
+        # --- endgame tablebase, below the root which choose_move resolves with DTZ ---
+        if self.tablebase is not None and ply > 0 and self.tablebase.covers(board):
+            wdl = self.tablebase.probe_wdl(board, self.board_hash(board))
+            if wdl is not None:
+                if self.stats is not None:
+                    self.stats.tb_hits += 1
+                return self.tablebase.score(wdl, ply), None
+
+        # Terminal node, or a line past the per-ply buffers, which only a search not started at the root reaches
+        if depth <= 0 or not 0 <= ply < MAX_PLY:
             if self.qsearch:
-                if maximizing:
-                    return self.quiescence(board, self.qdepth), None
-                else:
-                    return -self.quiescence(board, self.qdepth), None
-            else:
-                return self.main_eval(board), None
+                return self.quiescence(board, self.qdepth, alpha, beta), None
+            return self.perspective_eval(board), None
 
         if board.is_game_over():
-            return self.main_eval(board), None
-
+            return self.perspective_eval(board), None
+
+        # --- transposition table ---
+        h = self.board_hash(board)
+        entry = self.transposition_table.probe(h)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_move is not None and not board.is_legal(tt_move):
+                tt_move = None
+            if tt_depth >= depth and tt_move is not None:
+                if tt_flag == EXACT:
+                    return tt_score, (tt_move, False)
+                if tt_flag == LOWER and tt_score >= beta:
+                    return tt_score, (tt_move, False)
+                if tt_flag == UPPER and tt_score <= alpha:
+                    return tt_score, (tt_move, False)
+
+        # never prune at the root or when in check
+        selective = (self.null_move or self.lmr or self.futility) and ply > 0 and not board.is_check()
+
+        # --- null move: if passing still fails high, a real move will too ---
+        # not twice in a row, and not without pieces, where passing would dodge zugzwang
+        if (selective and self.null_move and depth > NULL_MOVE_R and board.move_stack[-1]
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            self.push(board, chess.Move.null())
+            score = -self.negamax(board, depth - 1 - NULL_MOVE_R, -beta, -beta + NULL_WINDOW)[0]
+            self.pop(board)
+            if score >= beta:
+                return score, None
+
+        # --- razoring and futility: near the leaves, quiet moves can't make up a large deficit ---
+        futile = False
+        if selective and self.futility and depth <= 2:
+            static = self.perspective_eval(board)
+            deficit = alpha - static
+            if depth == 2 and deficit >= RAZOR_MARGIN:
+                depth = 1
+            futile = depth == 1 and deficit >= FUTILITY_MARGIN
+
+        alpha_orig = alpha
         best_move = None
-        moves = self.all_moves(board)
-
-        if not moves:
-            return self.main_eval(board), None
-        moves.sort(
-            key=lambda m: board.is_capture(m[0]),
-            reverse=maximizing
-        )
-
-        if maximizing:
-            value = -1e9
-            for move, is_nudge in moves:
-                board.push(move)
-                score, _ = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
+        # moves are picked best first from the ply's buffer, no lists are built above the leaves
+        count = self.generate_moves(board, ply, tt_move)
+        buffer = self.move_buffers[ply]
+
+        if not count:
+            return self.perspective_eval(board), None
+
+        # --- late move reductions: quiet moves ordered late are searched a ply shallower first ---
+        reduce_late = selective and self.lmr and depth >= 3
+
+        # last ply: score the children in batches and cut over the resulting scores
+        leaf_moves = None
+        if depth == 1 and self.batch_leaves and not self.qsearch:
+            leaf_moves = [
+                cached_move(record & MOVE_BITS) for record in sorted(buffer[:count], reverse=True)
+                if not futile or record & NOISY
+            ]
+            count = len(leaf_moves)
+            leaf_scores = []
+            # evaluate_children scores from self.color's point of view
+            sign = 1 if board.turn == self.color else -1
+
+        value = static if futile else -1e9
+        searched = 0
+        for i in range(count):
+            if leaf_moves is not None:
+                move = leaf_moves[i]
+                if i == len(leaf_scores):
+                    batch = leaf_moves[i:i + min(max(i, 1), LEAF_BATCH)]
+                    leaf_scores += [sign * score for score in self.evaluate_children(board, batch)]
+                    self.nodes += len(batch)
+                score = leaf_scores[i]
+            else:
+                record = pick_move(buffer, i, count)
+                if futile and not record & NOISY:
+                    # only captures and promotions are searched, the static score stands in for the rest;
+                    # they all score above the quiet moves, so past a quiet hash move none are left
+                    if record >> SCORE_SHIFT < TT_MOVE_SCORE:
+                        break
+                    continue
+                move = cached_move(record & MOVE_BITS)
+                if searched == 0:
+                    score = self.search_move(board, move, depth, alpha, beta)
+                else:
+                    # quiet moves after the killers: not the hash move, a capture, a promotion or a killer
+                    late = reduce_late and searched >= LMR_MOVES and record >> SCORE_SHIFT < KILLER_SCORE
+                    score = self.search_move(board, move, depth, alpha, beta, 1 if late else 0, scout=True)
+                searched += 1
+
+            if score > value:
+                value = score
+                best_move = (move, False)
+
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                if self.stats is not None:
+                    self.stats.cutoffs += 1
+                self.update_ordering(board, move, depth, ply)
+                break  # beta cutoff
+
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table.store(h, depth, value, flag, best_move[0] if best_move else None)
+
+        return value, best_move
+
+    def search_move(self, board, move, depth, alpha, beta, reduction=0, scout=False):
+        """Score of move for the side to move, searched to depth - 1.
+
+        A scout search first only asks whether the move beats alpha, with a
+        null window and reduction plies less depth, and searches it again in
+        full when it does. Moves that give check are never reduced.
+        """
+        self.push(board, move)
+        if scout:
+            if reduction and board.is_check():
+                reduction = 0
+            score = -self.negamax(board, depth - 1 - reduction, -alpha - NULL_WINDOW, -alpha)[0]
+            if score > alpha and reduction:
+                score = -self.negamax(board, depth - 1, -alpha - NULL_WINDOW, -alpha)[0]
+            if alpha < score < beta:
+                score = -self.negamax(board, depth - 1, -beta, -alpha)[0]
+        else:
+            score = -self.negamax(board, depth - 1, -beta, -alpha)[0]
+        self.pop(board)
+        return score
+
+    def update_ordering(self, board, move, depth, ply):
+        """Remember a quiet move that caused a cutoff as a killer and in the history table"""
+        if board.is_capture(move) or move.promotion:
+            return
+
+        if 0 <= ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        history = self.history[board.turn]
+        index = move.from_square * 64 + move.to_square
+        history[index] += depth * depth
+        if history[index] > HISTORY_MAX:
+            for color_history in self.history:
+                for i in range(4096):
+                    color_history[i] //= 2
 
-                if score > value:
-                    value = score
-                    best_move = (move, is_nudge)
+    def perspective_eval(self, board):
+        """main_eval from the side to move's point of view"""
+        base = self.main_eval(board)
+        return base if board.turn == self.color else -base
 
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    break  # beta cutoff
+    def quiescence(self, board, depth, alpha=-1e9, beta=1e9):
+        """Negamax over captures and promotions, plus checks on its first ply, scored for the side to move"""
+        self.nodes += 1
+        if self.stats is not None:
+            self.stats.qnodes += 1
+        if self.nodes & 63 == 0:
+            self.check_limits()
 
-            return value, best_move
+        stand_pat = self.perspective_eval(board)
+        if depth == 0:
+            return stand_pat
 
+        # in check every evasion is searched and standing pat is no option, unless the evaluation saw a mate
+        in_check = board.is_check()
+        if in_check and abs(stand_pat) != math.inf:
+            best_score = -math.inf
+            moves = list(board.legal_moves)
         else:
-            value = 1e9
-            for move, is_nudge in moves:
-                board.push(move)
-                score, _ = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
+            if stand_pat >= beta:
+                return stand_pat
+            best_score = stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = self.noisy_moves(board, stand_pat, alpha, checks=depth == self.qdepth)
+
+        for move in moves:
+            self.push(board, move)
+            score = -self.quiescence(board, depth - 1, -beta, -alpha)
+            self.pop(board)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
 
-                if score < value:
-                    value = score
-                    best_move = (move, is_nudge)
+        return best_score
 
-                beta = min(beta, value)
-                if beta <= alpha:
-                    break  # alpha cutoff
+    def noisy_moves(self, board, stand_pat, alpha, checks=False):
+        """Captures and promotions worth searching in quiescence, MVV-LVA first, then quiet checks if asked for.
+
+        Captures that lose material by static exchange evaluation are
+        skipped, and so are captures that can't lift stand_pat to alpha even
+        with DELTA_MARGIN to spare (delta pruning).
+        """
+        scored = []
+        for move in board.generate_legal_captures():
+            # en passant leaves the target square empty, the victim is a pawn
+            victim = board.piece_type_at(move.to_square) or chess.PAWN
+            gain = ORDER_VALUES[victim] + (ORDER_VALUES[move.promotion] - 1 if move.promotion else 0)
+            if stand_pat + gain + DELTA_MARGIN <= alpha:
+                continue
+            attacker = board.piece_type_at(move.from_square)
+            # a capture by a less valuable piece can't lose material
+            if ORDER_VALUES[attacker] > ORDER_VALUES[victim] and self.see(board, move) < 0:
+                continue
+            scored.append((10 * gain - ORDER_VALUES[attacker], move))
 
-            return value, best_move
+        # promotions to an empty square
+        for move in board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied):
+            scored.append((10 * (ORDER_VALUES[move.promotion] - 1), move))
 
-    def perspective_eval(self, board):
-        base = self.evaluate(board)
-        return base if board.turn == self.color else -base
+        scored.sort(key=lambda item: item[0], reverse=True)
+        moves = [move for _, move in scored]
 
-    def quiescence(self, board, depth):
-        stand_pat = self.main_eval(board)
-        
-        if depth == 0 or board.is_repetition(2):
-            return stand_pat
-        
-        best_score = stand_pat
-        
-        for move in board.legal_moves:
-            if not board.is_capture(move) and not board.gives_check(move):
-                continue
-            board.push(move)
-            score = -self.quiescence(board, depth - 1)
-            board.pop()
-            best_score = max(best_score, score)
-        
-        return best_score
-        
-    def choose_move(self, board, depth=None):
+        if checks:
+            moves += [
+                move for move in board.generate_legal_moves(to_mask=~board.occupied)
+                if not move.promotion and not board.is_en_passant(move) and board.gives_check(move)
+            ]
+        return moves
+
+    def see(self, board, move):
+        """Static exchange evaluation of a capture in ORDER_VALUES: the material the side to move ends up
+        with if both sides keep recapturing on the target square with their least valuable piece, and may stop at any point"""
+        to_square = move.to_square
+        occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+        if board.is_en_passant(move):
+            occupied ^= chess.BB_SQUARES[to_square + (-8 if board.turn == chess.WHITE else 8)]
+            gains = [ORDER_VALUES[chess.PAWN]]
+        else:
+            gains = [ORDER_VALUES[board.piece_type_at(to_square)]]
+        on_square = board.piece_type_at(move.from_square)
+        if move.promotion:
+            gains[0] += ORDER_VALUES[move.promotion] - ORDER_VALUES[chess.PAWN]
+            on_square = move.promotion
+
+        color = not board.turn
+        while True:
+            attackers = board.attackers_mask(color, to_square, occupied) & occupied
+            if not attackers:
+                break
+            for piece_type in chess.PIECE_TYPES:
+                candidates = attackers & board.pieces_mask(piece_type, color)
+                if candidates:
+                    break
+            square = chess.lsb(candidates)
+            # the king can only take last
+            if piece_type == chess.KING and board.attackers_mask(not color, to_square, occupied ^ chess.BB_SQUARES[square]) & occupied:
+                break
+            gains.append(ORDER_VALUES[on_square] - gains[-1])
+            on_square = piece_type
+            occupied ^= chess.BB_SQUARES[square]
+            color = not color
+
+        # each side only recaptures when it comes out ahead
+        for i in range(len(gains) - 1, 0, -1):
+            gains[i - 1] = -max(-gains[i - 1], gains[i])
+        return gains[0]
+
+    def check_limits(self):
+        if self._stop is not None and self._stop.is_set():
+            raise SearchAborted
+        if self._deadline is not None and time.time() >= self._deadline:
+            raise SearchAborted
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchAborted
+
+    def allocate_time(self, wtime, btime, winc=0, binc=0, movestogo=None):
+        """Time management policy: how many seconds to spend on this move given the clocks (in seconds)"""
+        remaining = wtime if self.color == chess.WHITE else btime
+        increment = winc if self.color == chess.WHITE else binc
+        moves_left = movestogo if movestogo else 30
+
+        budget = remaining / moves_left + increment * 0.75
+        # never use more than half of what is left, and keep a little for overhead
+        budget = min(budget, remaining * 0.5)
+        return max(budget - 0.05, 0.01)
+
+    def start_next_iteration(self, elapsed, time_limit):
+        """The next depth usually takes several times longer, so don't start it past half the budget"""
+        return time_limit is None or elapsed < time_limit * 0.5
+
+    def choose_move(self, board, depth=None, time_limit=None, node_limit=None, stop=None, deadline=None, memo=True):
+        """Pick a move for board, returning (move, is_nudge).
+
+        stop is an optional threading.Event: once another thread sets it the
+        search unwinds within a few milliseconds and the deepest completed
+        iteration is played. deadline is an absolute time.time() by which
+        the search has to finish, on top of time_limit. With memo False a
+        position answered before is searched again, within the limits given.
+        """
+        self.finish_pondering(board)
 
         move = None
         move = self.openning(board)
@@ -137,10 +717,12 @@ class Bot:
                 return move, False
 
         self.turn += 1
+        self.transposition_table.new_search()
 
         h = chess.polyglot.zobrist_hash(board)
+        self.hashes.reset(board, h)
 
-        if h in self.past_moves_hash:
+        if memo and h in self.past_moves_hash:
             return self.past_moves_hash[h]
 
         # --- Mate in 1 override ---
@@ -151,54 +733,286 @@ class Bot:
                 return move, False
             board.pop()
 
-        # --- normal minimax ---
-        if depth is None:
-            depth = self.depth
+        # --- endgame tablebase ---
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(board)
+            if move is not None:
+                return move, False
 
-        maximizing = board.turn == self.color
+        # --- iterative deepening ---
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+        if depth is None:
+            # with a budget, search as deep as it allows
+            depth = self.depth if time_limit is None and node_limit is None else MAX_DEPTH
 
-        # if we're searching deeper than one ply, we can evaluate each first move
-        # in parallel to make use of multiple cores. the recursive minimax call
-        # uses its own board copy so no shared state is modified.
-        if depth > 1:
-            moves = self.all_moves(board)
-            best_score = -1e9 if maximizing else 1e9
-            best_move = None
-
-            def eval_move(move_tuple):
-                move, is_nudge = move_tuple
-                board_copy = board.copy()
-                board_copy.push(move)
-                score, _ = self.minimax(board_copy, depth - 1, -1e9, 1e9, not maximizing)
-                return score, move_tuple
-
-            with ThreadPoolExecutor() as executor:
-                for score, move_tuple in executor.map(eval_move, moves):
-                    if (maximizing and score > best_score) or (not maximizing and score < best_score):
-                        best_score = score
-                        best_move = move_tuple
-
-            if best_move is None:
-                legal_moves = list(board.legal_moves)
-                if legal_moves:
-                    return legal_moves[0], False
-                return None, False
-            self.past_moves_hash[h] = best_move
-            return best_move
-
-        # fall back to single-threaded minimax for shallow searches
-        score, best = self.minimax(board, depth, -1e9, 1e9, maximizing)
+        score, best = self.iterative_deepening(board, depth, time_limit, node_limit, stop, deadline)
 
         if best is None:
             legal_moves = list(board.legal_moves)
             if legal_moves:
                 return legal_moves[0], False
             return None, False
-        
-        self.past_moves_hash[h] = best
+
+        # a cancelled search is incomplete, don't answer this position with it later
+        if stop is None or not stop.is_set():
+            self.past_moves_hash[h] = best
         return best
 
+    # ------------------ PONDERING ------------------
+    # After playing a move the bot guesses the opponent's reply from the
+    # principal variation and searches the position after it in a thread.
+    # choose_move then either finds the finished search in past_moves_hash
+    # or, when the opponent played something else, stops the thread and
+    # searches with the transposition table it warmed up.
+
+    def start_pondering(self, board):
+        """Start searching the position after the expected reply to board's last move; False if there is no guess"""
+        if not self.ponder or board.is_game_over():
+            return False
+        self.stop_pondering()
+
+        board = board.copy()
+        self.hashes.reset(board)
+        pv = self.principal_variation(board, 1)
+        if not pv:
+            return False
+        board.push(pv[0])
+        if board.is_game_over():
+            return False
+
+        self._ponder_key = chess.polyglot.zobrist_hash(board)
+        self._ponder_stop = threading.Event()
+        self._ponder_thread = threading.Thread(
+            target=self.choose_move, args=(board,), kwargs={"stop": self._ponder_stop}, daemon=True
+        )
+        self._ponder_thread.start()
+        return True
+
+    def stop_pondering(self):
+        """Cancel the ponder search, if any, and wait for it to unwind"""
+        thread = self._ponder_thread
+        if thread is None or thread is threading.current_thread():
+            return
+        self._ponder_stop.set()
+        thread.join()
+        self._ponder_thread = None
+
+    def finish_pondering(self, board):
+        """Before searching board: wait for a ponder search of the same position, cancel any other"""
+        thread = self._ponder_thread
+        if thread is None or thread is threading.current_thread():
+            return
+        if chess.polyglot.zobrist_hash(board) == self._ponder_key:
+            thread.join()
+            self._ponder_thread = None
+        else:
+            self.stop_pondering()
+
+    def iterative_deepening(self, board, max_depth, time_limit=None, node_limit=None, stop=None, deadline=None):
+        """Search depth 1, 2, ... until max_depth or the budget runs out, returning the deepest completed result"""
+        maximizing = board.turn == self.color
+        root_ply = len(board.move_stack)
+        start = time.time()
+        if deadline is not None:
+            time_limit = deadline - start if time_limit is None else min(time_limit, deadline - start)
+
+        self.root_ply = root_ply
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # keep what history learned last move, but let this position outweigh it
+        for color_history in self.history:
+            for i in range(4096):
+                color_history[i] //= 2
+
+        self.nodes = 0
+        self.depth_reached = 0
+        # with the counters off, subscribers still get depth, score, nodes, time and pv
+        stats = self.stats if self.stats is not None else (SearchStats() if self.listeners else None)
+        if stats is not None:
+            stats.start_search(self.transposition_table)
+        # the first iteration always completes so there is a move to play, unless the search is stopped
+        self._deadline = None
+        self._node_limit = None
+        self._stop = stop
+
+        score, best = None, None
+        for depth in range(1, max_depth + 1):
+            try:
+                # with more than one worker, split the root moves across processes
+                if depth > 1 and self.threads > 1:
+                    result = self.parallel_search(board, depth)
+                else:
+                    # the search scores for the side to move, the previous iteration for self.color
+                    previous = None if score is None else (score if maximizing else -score)
+                    result = self.aspiration_search(board, depth, previous)
+            except SearchAborted:
+                result = None
+
+            if result is None:
+                # unwind whatever the aborted search left on the board
+                while len(board.move_stack) > root_ply:
+                    self.pop(board)
+                break
+
+            score, best = result
+            if not maximizing:
+                score = -score
+            self.depth_reached = depth
+            if stats is not None:
+                self.report_iteration(board, depth, score, stats)
+
+            if score is not None and abs(score) == math.inf:
+                break  # forced mate found
+            if not self.start_next_iteration(time.time() - start, time_limit):
+                break
+
+            if time_limit is not None:
+                self._deadline = start + time_limit
+            self._node_limit = node_limit
+
+        self._deadline = None
+        self._node_limit = None
+        self._stop = None
+        return score, best
+
+    def aspiration_search(self, board, depth, previous=None):
+        """Search the root in a window around the previous iteration's score, widening it on a fail"""
+        # tablebase scores are TB_WIN - ply, a window around one only wastes searches
+        if previous is None or abs(previous) >= TB_WIN - MAX_PLY:
+            return self.negamax(board, depth)
+
+        window = ASPIRATION_WINDOW
+        while window <= ASPIRATION_MAX:
+            alpha, beta = previous - window, previous + window
+            score, best = self.negamax(board, depth, alpha, beta)
+            if alpha < score < beta:
+                return score, best
+            window *= 4
+        return self.negamax(board, depth)
+
+    def principal_variation(self, board, max_length):
+        """Follow the best moves stored in the transposition table from board"""
+        pv = []
+        seen = set()
+        while len(pv) < max_length:
+            h = self.board_hash(board)
+            entry = self.transposition_table.probe(h)
+            if entry is None or entry[3] is None or h in seen or not board.is_legal(entry[3]):
+                break
+            seen.add(h)
+            pv.append(entry[3])
+            self.push(board, entry[3])
+        for _ in pv:
+            self.pop(board)
+        return pv
+
+    def report_iteration(self, board, depth, score, stats):
+        pv = self.principal_variation(board, depth)
+        info = stats.iteration(depth, score, self.nodes, pv)
+        for callback in self.listeners:
+            callback(info)
+
+    def get_pool(self):
+        if self._pool is None:
+            # spawned, not forked: a fork copies the lock of a stdin another thread is blocked reading
+            # (UCI.py's main loop), and the worker then hangs closing its copy of stdin
+            context = multiprocessing.get_context("spawn")
+            self._bound = context.Value("d", 0.0)
+            self._pool_stop = context.Event()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.threads,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self, self._bound, self._pool_stop)
+            )
+        return self._pool
+
+    def parallel_search(self, board, depth):
+        """Young brothers wait: search the first root move here to get a bound, then the rest in parallel.
+
+        Returns (score for the side to move, move) or None if the budget ran out before every root move was searched.
+        """
+        # the root's moves come from generate_moves like everywhere else in the search,
+        # with the previous iteration's best move first as the eldest brother
+        entry = self.transposition_table.probe(self.board_hash(board))
+        tt_move = entry[3] if entry is not None else None
+        if tt_move is not None and not board.is_legal(tt_move):
+            tt_move = None
+        ply = len(board.move_stack) - self.root_ply
+        count = self.generate_moves(board, ply, tt_move)
+        if not count:
+            return None
+        moves = [(cached_move(record & MOVE_BITS), False) for record in sorted(self.move_buffers[ply][:count], reverse=True)]
+
+        self.push(board, moves[0][0])
+        best_score = -self.negamax(board, depth - 1)[0]
+        self.pop(board)
+        best_move = moves[0]
+
+        pool = self.get_pool()
+        with self._bound.get_lock():
+            self._bound.value = best_score
+
+        # the pool pickles tasks in the background, possibly after a stopped search
+        # has unwound the board, so the tasks share one copy of it
+        root = board.copy()
+        # a node budget is split evenly between the workers
+        search_id = next(_search_ids)
+        node_share = None if self._node_limit is None else (self._node_limit - self.nodes) // self.threads
+        futures = [
+            (pool.submit(_search_root_move, root, move_tuple[0], depth, self._deadline, search_id, node_share), move_tuple)
+            for move_tuple in moves[1:]
+        ]
+
+        # hand a stop request on to the workers while waiting for them
+        pending = [future for future, _ in futures]
+        while self._stop is not None and wait(pending, timeout=0.005).not_done:
+            if self._stop.is_set():
+                self._pool_stop.set()
+                break
+
+        aborted = False
+        for future, move_tuple in futures:
+            score, fail_low, nodes, counters = future.result()
+            self.nodes += nodes
+            if self.stats is not None and counters is not None:
+                self.stats.merge(counters)
+            if score is None:
+                aborted = True
+            elif not fail_low and score > best_score:
+                best_score = score
+                best_move = move_tuple
+
+        self._pool_stop.clear()
+        if aborted:
+            return None
+        self.transposition_table.store(self.board_hash(board), depth, best_score, EXACT, best_move[0])
+        return best_score, best_move
+
+    def close(self):
+        self.stop_pondering()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+            self._bound = None
+            self._pool_stop = None
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+    def tt_stats(self):
+        """Hit and collision rates of the search and evaluation tables"""
+        return {
+            "search": self.transposition_table.stats(),
+            "eval": self.eval_cache.stats(),
+        }
+
     def reset(self):
+        self.stop_pondering()
         self.transposition_table.clear()
+        self.eval_cache.clear()
         self.past_moves_hash.clear()
         self.turn = 0
+        # workers hold copies of the tables, so start them over too
+        self.close()
@@ -3,8 +3,10 @@ from tkinter import simpledialog
 from PIL import Image, ImageDraw, ImageTk
 import chess
 import chess.pgn
-import math
+import chess.polyglot
 import threading
+from base.SearchStats import info_line
+from base.EvalWorker import EvalWorker
 
 SQUARE_SIZE = 70
 LIGHT = "#f0d9b5"
@@ -14,7 +16,7 @@ PREV_DARK = "#B49B0A"
 HIGHLIGHT = "#ec3838"
 
 class chessGUI:
-    def __init__(self, white_player='human', black_player=None):
+    def __init__(self, white_player='human', black_player=None, eval_depth=0):
         self.move_time = 100
         self.board = chess.Board()
         self.white_player = white_player
@@ -22,6 +24,11 @@ class chessGUI:
 
         self.white_eval_bot = None
         self.black_eval_bot = None
+        # the evaluation display is filled in by a background worker, with
+        # a search eval_depth plies deep or, at 0, the static evaluation
+        self.eval_depth = eval_depth
+        self.eval_worker = None
+        self.eval_key = None
 
         self.root = tk.Tk()
         self.root.title("Chess")
@@ -44,6 +51,11 @@ class chessGUI:
         self.nudge_targets = []
         self.prev_sq = []
 
+        # bumped whenever the position or the players change, so a search
+        # started before that is stopped and its move thrown away
+        self.search_generation = 0
+        self.search_stop = threading.Event()
+
         self.status = tk.Label(self.root, text="", font=("Arial", 14))
         self.status.pack()
 
@@ -72,12 +84,21 @@ class chessGUI:
         )
         self.black_eval.pack(side=tk.LEFT, padx=5)
 
+        # latest search info line of whichever bot is thinking
+        self.search_info = tk.Label(self.root, text="", font=("Courier", 9))
+        self.search_info.pack()
+        for player in (white_player, black_player):
+            if hasattr(player, "add_listener"):
+                player.add_listener(self.on_search_info)
+
         # copy PGN button
         self.copy_pgn_btn = tk.Button(self.root, text="Copy PGN", command=self.copy_pgn)
         self.copy_pgn_btn.pack(pady=2)
 
         self.canvas.bind("<Button-1>", self.on_click)
-        self.draw()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.build_board()
+        self.draw(full=True)
 
         # Start bot move immediately if it's bot vs bot and Black is first
         self.root.after(self.move_time, self.bot_turn)
@@ -85,12 +106,55 @@ class chessGUI:
     def get_eval_bots(self, white_eval_bot, black_eval_bot):
         self.white_eval_bot = white_eval_bot
         self.black_eval_bot = black_eval_bot
+        self.reset_evaluation()
+        self.request_evaluation()
+
+    def request_evaluation(self):
+        """Show the evaluation of the current position, from the cache or once the worker has it"""
+        key = chess.polyglot.zobrist_hash(self.board)
+        if key == self.eval_key:
+            return  # same position, e.g. a piece was only selected
+        self.eval_key = key
+
+        if self.eval_worker is None:
+            # evaluation bots take precedence; otherwise use the player bot if it's not human
+            evaluators = [
+                eval_bot if eval_bot is not None else (player if hasattr(player, "evaluate") else None)
+                for eval_bot, player in ((self.white_eval_bot, self.white_player), (self.black_eval_bot, self.black_player))
+            ]
+            self.eval_worker = EvalWorker(evaluators, self.on_evaluation, self.eval_depth)
+
+        cached = self.eval_worker.lookup(key)
+        if cached is not None:
+            self.update_evaluation(*cached)
+        else:
+            self.eval_worker.submit(self.board)
+
+    def on_evaluation(self, key, white_eval, black_eval):
+        """Called from the evaluation worker"""
+        self.root.after(0, lambda: self.show_evaluation(key, white_eval, black_eval))
+
+    def show_evaluation(self, key, white_eval, black_eval):
+        if key == self.eval_key:
+            self.update_evaluation(white_eval, black_eval)
+
+    def reset_evaluation(self):
+        """Drop the worker, so the next request evaluates with the current bots"""
+        if self.eval_worker is not None:
+            self.eval_worker.close()
+            self.eval_worker = None
+        self.eval_key = None
 
     def update_evaluation(self, white_eval, black_eval):
         """Update the evaluation display for both sides"""
         self.white_eval.config(text=f"White: {white_eval:+.1f}")
         self.black_eval.config(text=f"Black: {black_eval:+.1f}")
 
+    def on_search_info(self, info):
+        """Called from the search thread after every iteration"""
+        line = info_line(info)
+        self.root.after(0, lambda: self.search_info.config(text=line))
+
     def ask_promotion(self):
         """Ask user for pawn promotion piece"""
         choices = {'q': chess.QUEEN, 'r': chess.ROOK, 'b': chess.BISHOP, 'n': chess.KNIGHT}
@@ -172,80 +236,87 @@ class chessGUI:
         d.ellipse((3, 3, ring_size-4, ring_size-4), outline=(60,60,60,200), width=4)
         self.move_ring = ImageTk.PhotoImage(ring)
         
-    def draw(self):
-        # refresh PGN text each redraw
-        pgn = chess.pgn.Game.from_board(self.board)
-
-        white_eval = 0
-        black_eval = 0
-        # evaluation bots take precedence; otherwise use the player bot if it's not human
-        if self.white_eval_bot is not None:
-            white_eval = self.white_eval_bot.evaluate(self.board)
-        elif self.white_player != "human":
-            white_eval = self.white_player.evaluate(self.board)
-        else:
-            white_eval = math.nan
-        
-        if self.black_eval_bot is not None:
-            black_eval = self.black_eval_bot.evaluate(self.board)
-        elif self.black_player != "human":
-            black_eval = self.black_player.evaluate(self.board)
-        else:
-            black_eval = math.nan
-
-        self.update_evaluation(white_eval, black_eval)
-        self.canvas.delete("all")
-        p = 0
-        for r in range(8):
-            for f in range(8):
-                x1 = f * SQUARE_SIZE
-                y1 = (7 - r) * SQUARE_SIZE
-                color = LIGHT if (r + f) % 2 == 0 else DARK
-                sq = chess.square(f, r)
-
-                if p in self.prev_sq:
-                    color = PREV_LIGHT if (r + f) % 2 == 0 else PREV_DARK
-
-                if self.board.is_check() and sq == self.board.king(self.board.turn):
-                    color = HIGHLIGHT
-
-                self.canvas.create_rectangle(
-                    x1, y1, x1 + SQUARE_SIZE, y1 + SQUARE_SIZE, fill=color, outline=color
-                )
-
-                piece = self.board.piece_at(sq)
-                if piece:
-                    self.canvas.create_image(
-                        x1 + SQUARE_SIZE // 2,
-                        y1 + SQUARE_SIZE // 2,
-                        image=self.images[piece.symbol()]
-                    )
-                p += 1
-
-        for move in self.legal_moves:
-            to_sq = move.to_square
-            f = chess.square_file(to_sq)
-            r = chess.square_rank(to_sq)
-
-            x = f * SQUARE_SIZE + SQUARE_SIZE // 2
-            y = (7 - r) * SQUARE_SIZE + SQUARE_SIZE // 2
-
-            for move in self.legal_moves:
-                to_sq = move.to_square
-                f = chess.square_file(to_sq)
-                r = chess.square_rank(to_sq)
-
-                x = f * SQUARE_SIZE + SQUARE_SIZE // 2
-                y = (7 - r) * SQUARE_SIZE + SQUARE_SIZE // 2
-
-                if self.board.piece_at(to_sq):
-                    self.canvas.create_image(x, y, image=self.move_ring)
+    # ------------------ BOARD RENDERING ------------------
+    # The canvas items are created once: a rectangle, a piece image and a
+    # move marker per square. draw() only reconfigures the squares that can
+    # have changed, the last move's squares and whatever was highlighted
+    # before, and skips any item that already looks right.
+
+    def build_board(self):
+        self.square_items = []
+        self.piece_items = []
+        self.marker_items = []
+        for sq in chess.SQUARES:
+            x1 = chess.square_file(sq) * SQUARE_SIZE
+            y1 = (7 - chess.square_rank(sq)) * SQUARE_SIZE
+            self.square_items.append(self.canvas.create_rectangle(x1, y1, x1 + SQUARE_SIZE, y1 + SQUARE_SIZE))
+        # pieces above every square, markers above every piece
+        for items in (self.piece_items, self.marker_items):
+            for sq in chess.SQUARES:
+                x = chess.square_file(sq) * SQUARE_SIZE + SQUARE_SIZE // 2
+                y = (7 - chess.square_rank(sq)) * SQUARE_SIZE + SQUARE_SIZE // 2
+                items.append(self.canvas.create_image(x, y, state=tk.HIDDEN))
+
+        # what each square shows now: fill color, piece symbol, marker image
+        self.drawn = [(None, None, None)] * 64
+        # squares drawn differently from a plain board
+        self.highlighted = set()
+
+    def square_look(self, sq, markers, check_square):
+        is_light = (chess.square_rank(sq) + chess.square_file(sq)) % 2 == 0
+        last_move = sq in self.prev_sq
+
+        color = LIGHT if is_light else DARK
+        if last_move:
+            color = PREV_LIGHT if is_light else PREV_DARK
+        if sq == check_square:
+            color = HIGHLIGHT
+
+        piece = self.board.piece_at(sq)
+        symbol = piece.symbol() if piece else None
+
+        marker = None
+        if sq in markers:
+            if piece:
+                marker = self.move_ring
+            elif last_move:
+                marker = self.move_dot_prev_light if is_light else self.move_dot_prev_dark
+            else:
+                marker = self.move_dot_light if is_light else self.move_dot_dark
+        return color, symbol, marker
+
+    def draw(self, full=False):
+        self.request_evaluation()
+
+        markers = {move.to_square for move in self.legal_moves}
+        check_square = self.board.king(self.board.turn) if self.board.is_check() else None
+        highlighted = set(self.prev_sq) | markers
+        if check_square is not None:
+            highlighted.add(check_square)
+
+        # the pieces can only have moved on the last move's squares
+        squares = chess.SQUARES if full else highlighted | self.highlighted
+        self.highlighted = highlighted
+
+        for sq in squares:
+            look = self.square_look(sq, markers, check_square)
+            if look == self.drawn[sq]:
+                continue
+            color, symbol, marker = look
+            drawn_color, drawn_symbol, drawn_marker = self.drawn[sq]
+            if color != drawn_color:
+                self.canvas.itemconfig(self.square_items[sq], fill=color, outline=color)
+            if symbol != drawn_symbol:
+                if symbol is None:
+                    self.canvas.itemconfig(self.piece_items[sq], state=tk.HIDDEN)
                 else:
-                    is_light = (r + f) % 2 == 0
-                    dot = self.move_dot_light if is_light else self.move_dot_dark
-                    if to_sq in self.prev_sq:
-                        dot = self.move_dot_prev_light if is_light else self.move_dot_prev_dark
-                    self.canvas.create_image(x, y, image=dot)
+                    self.canvas.itemconfig(self.piece_items[sq], image=self.images[symbol], state=tk.NORMAL)
+            if marker is not drawn_marker:
+                if marker is None:
+                    self.canvas.itemconfig(self.marker_items[sq], state=tk.HIDDEN)
+                else:
+                    self.canvas.itemconfig(self.marker_items[sq], image=marker, state=tk.NORMAL)
+            self.drawn[sq] = look
 
     def square_at(self, x, y):
         file = x // SQUARE_SIZE
@@ -257,16 +328,44 @@ class chessGUI:
         self.legal_moves.clear()
 
         # normal legal moves
-        for m in self.board.legal_moves:
-            if m.from_square == square:
-                self.legal_targets.append(m.to_square)
-
-        for m in self.board.legal_moves:
-            if m.from_square == square:
-                self.legal_moves.append(m)
+        for m in self.board.generate_legal_moves(from_mask=chess.BB_SQUARES[square]):
+            self.legal_targets.append(m.to_square)
+            self.legal_moves.append(m)
 
     def set_board(self, fen):
+        self.cancel_search()
         self.board.set_fen(fen)
+        self.prev_sq.clear()
+        self.draw(full=True)
+        self.root.after(self.move_time, self.bot_turn)
+
+    def set_players(self, white_player, black_player):
+        self.cancel_search()
+        for player in (self.white_player, self.black_player):
+            if hasattr(player, "remove_listener"):
+                player.remove_listener(self.on_search_info)
+        self.white_player = white_player
+        self.black_player = black_player
+        for player in (white_player, black_player):
+            if hasattr(player, "add_listener"):
+                player.add_listener(self.on_search_info)
+        self.reset_evaluation()
+        self.request_evaluation()
+        self.root.after(self.move_time, self.bot_turn)
+
+    def cancel_search(self):
+        """Stop the running bot search, if any; its move will be ignored"""
+        self.search_generation += 1
+        self.search_stop.set()
+        self.search_stop = threading.Event()
+        for player in (self.white_player, self.black_player):
+            if hasattr(player, "stop_pondering"):
+                player.stop_pondering()
+
+    def close(self):
+        self.cancel_search()
+        self.reset_evaluation()
+        self.root.destroy()
         
     def update_status(self):
         if self.board.is_checkmate():
@@ -312,8 +411,7 @@ class chessGUI:
                     rank = chess.square_rank(sq)
                     if rank == 0 or rank == 7:
                         promotion = self.ask_promotion()
-                self.prev_sq = [self.selected, sq]
-                self.board.push(chess.Move(self.selected, sq, promotion=promotion))
+                self.push_move(chess.Move(self.selected, sq, promotion=promotion))
                 self.after_player_move()
 
             self.selected = None
@@ -333,24 +431,28 @@ class chessGUI:
 
         # copy board for thread safety; the original board may be modified by user events
         board_copy = self.board.copy()
+        generation = self.search_generation
+        stop = self.search_stop
 
         def compute_move():
-            move, is_nudge = current_player.choose_move(board_copy)
+            move, is_nudge = current_player.choose_move(board_copy, stop=stop)
+            if stop.is_set():
+                return  # cancelled, and the window may be gone
             # schedule application of the move back on the main thread
-            self.root.after(0, lambda: self._apply_bot_move(move, is_nudge))
+            self.root.after(0, lambda: self._apply_bot_move(move, is_nudge, generation))
 
         threading.Thread(target=compute_move, daemon=True).start()
 
-    def _apply_bot_move(self, move, is_nudge):
+    def _apply_bot_move(self, move, is_nudge, generation):
         # this runs on the Tkinter main thread
+        if generation != self.search_generation:
+            return  # searched for a position that is gone
+
         if move is not None:
-            self.prev_sq.clear()
-            curr_board = self.board.piece_map().copy()
-            self.board.push(move)
-            changed_board = self.board.piece_map().copy()
-            for part in range(64):
-                if curr_board.get(part) != changed_board.get(part):
-                    self.prev_sq.append(part)
+            mover = self.white_player if self.board.turn == chess.WHITE else self.black_player
+            self.push_move(move)
+            # think about the reply while the opponent thinks about it
+            mover.start_pondering(self.board)
             self.draw()
             self.update_status()
 
@@ -358,6 +460,13 @@ class chessGUI:
         if next_player != 'human' and not self.board.is_game_over():
             self.root.after(self.move_time, self.bot_turn)
 
+    def push_move(self, move):
+        """Play move on the board and mark every square it changed, castling rooks and en passant included"""
+        curr_board = self.board.piece_map()
+        self.board.push(move)
+        changed_board = self.board.piece_map()
+        self.prev_sq = [part for part in range(64) if curr_board.get(part) != changed_board.get(part)]
+
     def after_player_move(self):
         if self.update_status():
             return
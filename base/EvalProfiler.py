@@ -0,0 +1,103 @@
+import json
+import math
+import time
+
+class EvalProfiler:
+    """Time per evaluation section and the spread of each term's contribution to the score.
+
+    The evaluation calls start() when it begins and lap(name) at the end of
+    every section, so each section is charged the time since the previous
+    lap. record() keeps the value every term added to the score, which
+    shows the terms that cost time but hardly move the score.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = {}
+        self.calls = {}
+        self.values = {}
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, name, calls=1):
+        now = time.perf_counter()
+        self.times[name] = self.times.get(name, 0.0) + now - self._last
+        self.calls[name] = self.calls.get(name, 0) + calls
+        self._last = now
+
+    def record(self, names, values):
+        """Add one contribution per term; a value may also be a list or NumPy column of them"""
+        for name, value in zip(names, values):
+            column = self.values.setdefault(name, [])
+            if hasattr(value, "tolist"):
+                column.extend(value.tolist())
+            elif isinstance(value, (list, tuple)):
+                column.extend(value)
+            else:
+                column.append(value)
+
+    def report(self):
+        total_time = sum(self.times.values())
+        sections = {
+            name: {
+                "calls": self.calls[name],
+                "seconds": seconds,
+                "us_per_call": seconds / self.calls[name] * 1e6 if self.calls[name] else 0.0,
+                "share": seconds / total_time if total_time else 0.0,
+            }
+            for name, seconds in self.times.items()
+        }
+
+        terms = {name: distribution(values) for name, values in self.values.items()}
+        # a term that adds nearly the same amount everywhere never changes which move is best,
+        # so its share is of the spread of the score rather than of its size
+        total_spread = sum(term["std"] for term in terms.values())
+        for term in terms.values():
+            term["share"] = term["std"] / total_spread if total_spread else 0.0
+
+        return {"seconds": total_time, "sections": sections, "terms": terms}
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"{'section':<16} {'calls':>9} {'seconds':>9} {'us/call':>9} {'share':>7}"]
+        for name, section in sorted(report["sections"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{name:<16} {section['calls']:>9} {section['seconds']:>9.3f} "
+                f"{section['us_per_call']:>9.2f} {section['share']:>7.1%}"
+            )
+        lines.append("")
+        lines.append(f"{'term':<16} {'mean':>9} {'mean|x|':>9} {'std':>9} {'min':>9} {'median':>9} {'max':>9} {'share':>7}")
+        for name, term in sorted(report["terms"].items(), key=lambda item: -item[1]["std"]):
+            lines.append(
+                f"{name:<16} {term['mean']:>9.4f} {term['mean_abs']:>9.4f} {term['std']:>9.4f} "
+                f"{term['min']:>9.4f} {term['p50']:>9.4f} {term['max']:>9.4f} {term['share']:>7.1%}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+def distribution(values):
+    """Summary statistics of a list of numbers"""
+    if not values:
+        return {"count": 0, "mean": 0.0, "mean_abs": 0.0, "std": 0.0,
+                "min": 0.0, "p5": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    count = len(ordered)
+    mean = sum(ordered) / count
+    return {
+        "count": count,
+        "mean": mean,
+        "mean_abs": sum(abs(value) for value in ordered) / count,
+        "std": math.sqrt(sum((value - mean) ** 2 for value in ordered) / count),
+        "min": ordered[0],
+        "p5": ordered[int(0.05 * (count - 1))],
+        "p50": ordered[int(0.5 * (count - 1))],
+        "p95": ordered[int(0.95 * (count - 1))],
+        "max": ordered[-1],
+    }
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import copy
+import math
+import threading
+import chess
+import chess.polyglot
+
+class EvalWorker:
+    """Scores positions for the GUI's evaluation display on a background thread.
+
+    evaluators holds a bot (or None) for White and Black. The worker uses
+    its own copies of them, so it never shares search state with a bot
+    that is thinking about its move. With depth 0 a position gets the
+    bots' static evaluate(), otherwise the score of a search that deep.
+
+    Only the latest position submitted is evaluated: a request that hasn't
+    started yet is replaced by the next one, so a burst of redraws costs a
+    single evaluation. Results are kept in an LRU cache keyed by Zobrist
+    hash and handed to callback(key, white_eval, black_eval) on the worker
+    thread.
+    """
+
+    def __init__(self, evaluators, callback, depth=0, cache_size=4096):
+        self.evaluators = [copy.deepcopy(bot) if bot is not None else None for bot in evaluators]
+        self.callback = callback
+        self.depth = depth
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+        self.condition = threading.Condition()
+        self.pending = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def lookup(self, key):
+        """(white_eval, black_eval) of a position evaluated before, or None"""
+        with self.condition:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def submit(self, board):
+        """Ask for board's evaluation, returning its Zobrist key; the result arrives through callback"""
+        key = chess.polyglot.zobrist_hash(board)
+        with self.condition:
+            self.pending = (key, board.copy())
+            self.condition.notify()
+        return key
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                key, board = self.pending
+                self.pending = None
+
+            result = self.lookup(key)
+            if result is None:
+                result = tuple(self.score(bot, board) for bot in self.evaluators)
+                with self.condition:
+                    self.cache[key] = result
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+            if not self.closed:
+                self.callback(key, *result)
+
+    def score(self, bot, board):
+        if bot is None:
+            return math.nan
+        if self.depth <= 0 or board.is_game_over():
+            return bot.evaluate(board)
+        bot.hashes.reset(board)
+        bot.transposition_table.new_search()
+        score, _ = bot.iterative_deepening(board, self.depth)
+        return score
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
@@ -0,0 +1,59 @@
+import random
+import chess
+import chess.polyglot
+
+class OpeningBook:
+    """Opening moves looked up by the position's polyglot Zobrist key.
+
+    Entries come from a polyglot .bin file, which is memory mapped and
+    binary searched so a large book costs neither startup time nor memory,
+    and/or from lines given in code as {"e2e4 e7e5": [("g1f3", weight), ...]}.
+    Moves are picked at random in proportion to their weights.
+    """
+
+    def __init__(self, path=None, lines=None):
+        self.path = path
+        self._reader = None
+        self.positions = {}
+        for line, replies in (lines or {}).items():
+            self.add_line(line, replies)
+
+    def __getstate__(self):
+        # the memory map is reopened on first use in the other process
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        return state
+
+    def add_line(self, line, replies):
+        board = chess.Board()
+        for uci in line.split():
+            board.push_uci(uci)
+        entries = self.positions.setdefault(chess.polyglot.zobrist_hash(board), [])
+        entries.extend((chess.Move.from_uci(uci), weight) for uci, weight in replies)
+
+    def reader(self):
+        if self._reader is None and self.path is not None:
+            self._reader = chess.polyglot.open_reader(self.path)
+        return self._reader
+
+    def entries(self, board):
+        """(move, weight) pairs for board, legal moves only"""
+        entries = list(self.positions.get(chess.polyglot.zobrist_hash(board), ()))
+        reader = self.reader()
+        if reader is not None:
+            # given the board, find_all turns polyglot's king-takes-rook castling into normal moves
+            entries.extend((entry.move, entry.weight) for entry in reader.find_all(board))
+        return [(move, weight) for move, weight in entries if board.is_legal(move)]
+
+    def choose(self, board):
+        """A weighted random book move for board, or None when the position is not in the book"""
+        entries = self.entries(board)
+        if not entries or not sum(weight for _, weight in entries):
+            return None
+        moves, weights = zip(*entries)
+        return random.choices(moves, weights)[0]
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
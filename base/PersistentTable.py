@@ -0,0 +1,162 @@
+import hashlib
+import mmap
+import os
+import struct
+from base.TranspositionTable import TranspositionTable, ENTRY_SIZE, USED, table_slots, pack_move, unpack_move
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b"CHTT"
+# 2: scores are for the side to move
+FORMAT = 2
+# magic, format, slot count and shared generation, padded so the columns stay 8 byte aligned
+HEADER = struct.Struct("<4sIQI")
+HEADER_SIZE = 64
+
+# bytes written at a time when a file is cleared
+CLEAR_CHUNK = 1 << 20
+
+QWORD = struct.Struct("<Q")
+DOUBLE = struct.Struct("<d")
+
+def version_salt(version):
+    """64 bit key salt for a bot version string, so bots with different settings never read each other's entries"""
+    return int.from_bytes(hashlib.blake2b(version.encode(), digest_size=8).digest(), "little")
+
+class PersistentTable(TranspositionTable):
+    """TranspositionTable kept in a memory mapped file, shared by every process that opens it.
+
+    Several bots can use one file: keys are salted with the bot's version
+    (its name and the settings that change scores), so a different version
+    only ever misses. Writers don't lock; every slot's key is stored XORed
+    with its score and data words, so a slot torn by two processes writing
+    at once fails the key check and reads as empty. The file has a fixed
+    size and evicts entries with the same replacement rules as the
+    in-memory table, using a generation shared through the header. The file
+    keeps the size it was created with, whatever size_mb later openers ask for.
+    """
+
+    def __init__(self, path, size_mb=16, version=""):
+        self.path = path
+        self.version = version
+        self.salt = version_salt(version)
+        self.mm = None
+        super().__init__(size_mb)
+
+    def __getstate__(self):
+        return {"path": self.path, "size_mb": self.size_mb, "version": self.version}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["size_mb"], state["version"])
+
+    def resize(self, size_mb):
+        self.close()
+        slots = table_slots(size_mb)
+
+        # created if missing but never truncated or opened for appending, every write goes to its offset
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, HEADER.size, 0)
+            file_size = os.fstat(fd).st_size
+            valid = len(header) == HEADER.size and HEADER.unpack(header)[:2] == (MAGIC, FORMAT)
+            if valid and file_size >= HEADER_SIZE + HEADER.unpack(header)[2] * ENTRY_SIZE:
+                # shrinking or growing a file other processes have mapped would pull it out from under them
+                slots = HEADER.unpack(header)[2]
+            else:
+                # new file or an older format: start empty. Other processes may still have the old
+                # file mapped, so it is only ever grown and cleared in place, never cut short
+                size = HEADER_SIZE + slots * ENTRY_SIZE
+                if file_size < size:
+                    os.ftruncate(fd, size)
+                for offset in range(0, size, CLEAR_CHUNK):
+                    os.pwrite(fd, bytes(min(CLEAR_CHUNK, size - offset)), offset)
+                os.pwrite(fd, HEADER.pack(MAGIC, FORMAT, slots, 0), 0)
+            self.mm = mmap.mmap(fd, HEADER_SIZE + slots * ENTRY_SIZE)
+            if fcntl is not None:
+                # the map holds a duplicate of the descriptor, which would keep the lock alive
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+        self.size_mb = slots * ENTRY_SIZE / (1024 * 1024)
+
+        self.attach(self.mm, HEADER_SIZE)
+        # the score column again, as integers for the key check
+        self.score_bits = self.scores.cast("B").cast("Q")
+        self.generation = HEADER.unpack_from(self.mm)[3]
+        self.reset_stats()
+
+    def clear(self):
+        # the file outlives the bot, reset only empties this process' counters; use wipe() to empty it
+        self.reset_stats()
+
+    def wipe(self):
+        self.mm[HEADER_SIZE:] = bytes(len(self.mm) - HEADER_SIZE)
+
+    def new_search(self):
+        self.generation = (HEADER.unpack_from(self.mm)[3] + 1) & 63
+        HEADER.pack_into(self.mm, 0, MAGIC, FORMAT, self.slots, self.generation)
+
+    def probe(self, key):
+        self.probes += 1
+        key ^= self.salt
+        index = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        score_bits = self.score_bits
+
+        # read each word once, the check only vouches for the values it was computed from
+        word = data[index]
+        bits = score_bits[index]
+        if keys[index] ^ bits ^ word != key:
+            index += 1
+            word = data[index]
+            bits = score_bits[index]
+            if keys[index] ^ bits ^ word != key:
+                if word or data[index - 1]:
+                    self.collisions += 1
+                return None
+
+        if not word:
+            return None
+        self.hits += 1
+        score = DOUBLE.unpack(QWORD.pack(bits))[0]
+        return (word >> 17) & 255, score, (word >> 15) & 3, unpack_move(word & 32767)
+
+    def store(self, key, depth, score, flag, move=None):
+        self.stores += 1
+        key ^= self.salt
+        index = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        score_bits = self.score_bits
+
+        if keys[index + 1] ^ score_bits[index + 1] ^ data[index + 1] == key:
+            index += 1
+        elif keys[index] ^ score_bits[index] ^ data[index] != key:
+            old = data[index]
+            if old and ((old >> 25) & 63) == self.generation and ((old >> 17) & 255) >= depth:
+                index += 1
+            if data[index]:
+                self.overwrites += 1
+
+        word = pack_move(move) | (flag << 15) | (min(max(depth, 0), 255) << 17) | (self.generation << 25) | USED
+        # the check is built from what this process wrote, not read back, so a concurrent writer breaks it
+        self.scores[index] = score
+        data[index] = word
+        keys[index] = key ^ QWORD.unpack(DOUBLE.pack(score))[0] ^ word
+
+    def close(self):
+        if self.mm is not None:
+            # the views have to go before the map can be closed
+            self.keys.release()
+            self.scores.release()
+            self.data.release()
+            self.score_bits.release()
+            self.mm.close()
+            self.mm = None
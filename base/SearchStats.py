@@ -0,0 +1,75 @@
+import time
+
+class SearchStats:
+    """Counters for one call to choose_move, filled in by Bot while it searches.
+
+    Nodes are counted by the bot itself (bot.nodes); these are the extra
+    counters that tell where the time went: quiescence nodes, cutoffs,
+    transposition table hits, time spent in evaluate and tablebase hits.
+    """
+
+    COUNTERS = ("qnodes", "cutoffs", "eval_calls", "eval_time", "tb_hits")
+
+    def __init__(self):
+        self.start_search()
+
+    def start_search(self, tt=None):
+        self.start = time.time()
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.eval_calls = 0
+        self.eval_time = 0.0
+        self.tb_hits = 0
+        self.iterations = []
+        # the table keeps running totals, remember where this search started
+        self._tt = tt
+        self._tt_start = (tt.probes, tt.hits) if tt is not None else (0, 0)
+
+    def counters(self):
+        return {name: getattr(self, name) for name in self.COUNTERS}
+
+    def merge(self, counters):
+        """Add the counters of a search done elsewhere, e.g. in a worker process"""
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def tt_hit_rate(self):
+        if self._tt is None:
+            return 0.0
+        probes = self._tt.probes - self._tt_start[0]
+        hits = self._tt.hits - self._tt_start[1]
+        return hits / probes if probes else 0.0
+
+    def iteration(self, depth, score, nodes, pv):
+        """Record a completed iteration and return its info dict"""
+        elapsed = time.time() - self.start
+        info = {
+            "depth": depth,
+            "score": score,
+            "nodes": nodes,
+            "qnodes": self.qnodes,
+            "time": elapsed,
+            "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+            "cutoffs": self.cutoffs,
+            "tt_hit_rate": self.tt_hit_rate(),
+            "eval_calls": self.eval_calls,
+            "eval_time": self.eval_time,
+            "tb_hits": self.tb_hits,
+            "pv": [move.uci() for move in pv],
+        }
+        self.iterations.append(info)
+        return info
+
+    def summary(self):
+        """The last iteration's info, or an empty dict before the first one finishes"""
+        return self.iterations[-1] if self.iterations else {}
+
+def info_line(info):
+    """One line summary of an iteration's info dict, in the style of UCI info lines"""
+    score = info["score"]
+    score = "none" if score is None else f"{score:+.2f}"
+    return (
+        f"depth {info['depth']} score {score} nodes {info['nodes']} nps {info['nps']} "
+        f"time {int(info['time'] * 1000)} qnodes {info['qnodes']} cutoffs {info['cutoffs']} "
+        f"tthits {info['tt_hit_rate']:.0%} pv {' '.join(info['pv'])}"
+    )
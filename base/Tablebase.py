@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import os
+import chess
+import chess.syzygy
+
+# score of a tablebase win, far above any evaluation but below checkmate (inf)
+TB_WIN = 1000.0
+
+class Tablebase:
+    """Syzygy WDL/DTZ probes with a bounded LRU cache of WDL results keyed by Zobrist hash.
+
+    Only positions with at most max_pieces pieces and no castling rights are
+    probed. Tables are opened on first use, so creating the object is cheap
+    and a copy in a worker process opens its own files.
+    """
+
+    def __init__(self, path, max_pieces=5, cache_size=65536):
+        # the tables are opened lazily, so a bad path would only fail inside the first search
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Syzygy directory not found: {path}")
+        self.path = path
+        self.max_pieces = max_pieces
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._tables = None
+        self.hits = 0
+        self.probes = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tables"] = None
+        state["cache"] = OrderedDict()
+        return state
+
+    def tables(self):
+        if self._tables is None:
+            self._tables = chess.syzygy.open_tablebase(self.path)
+            # names like KRvK, so the largest table has one piece per letter but the v
+            largest = max((len(name) - 1 for name in self._tables.wdl), default=0)
+            self.max_pieces = min(self.max_pieces, largest)
+        return self._tables
+
+    def covers(self, board):
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def probe_wdl(self, board, key):
+        """Win/draw/loss for the side to move (2, 1, 0, -1, -2 with 1/-1 spoiled by the 50 move rule), or None"""
+        tables = self.tables()
+        if not self.covers(board):
+            return None
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+
+        self.probes += 1
+        try:
+            wdl = tables.probe_wdl(board)
+        except KeyError:
+            # missing table
+            wdl = None
+
+        self.cache[key] = wdl
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return wdl
+
+    def probe_dtz(self, board):
+        tables = self.tables()
+        if not self.covers(board):
+            return None
+        try:
+            return tables.probe_dtz(board)
+        except KeyError:
+            return None
+
+    def best_move(self, board):
+        """The move that keeps the best result and converts it fastest, or None if the root isn't in the tables"""
+        self.tables()
+        if not self.covers(board):
+            return None
+        best = None
+        best_rank = None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            mate = board.is_checkmate()
+            # DTZ is from the opponent's side: negative means they lose
+            dtz = 0 if mate else self.probe_dtz(board)
+            board.pop()
+            if dtz is None:
+                return None
+
+            if mate:
+                rank = (3, 0, 0)
+            elif dtz < 0:
+                # winning: prefer zeroing moves, then the shortest way to the next zeroing move
+                rank = (2, 1 if zeroing else 0, dtz)
+            elif dtz == 0:
+                rank = (1, 0, 0)
+            else:
+                # losing: hold out as long as possible
+                rank = (0, 0, dtz)
+
+            if best_rank is None or rank > best_rank:
+                best, best_rank = move, rank
+        return best
+
+    def score(self, wdl, ply):
+        """Search score of a WDL result for the side to move, wins sooner and losses later scoring better"""
+        if wdl > 1:
+            return TB_WIN - ply
+        if wdl < -1:
+            return -TB_WIN + ply
+        return 0.0
+
+    def hit_rate(self):
+        total = self.hits + self.probes
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        if self._tables is not None:
+            self._tables.close()
+            self._tables = None
@@ -0,0 +1,136 @@
+import chess
+
+# bound flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# bytes per entry: 8 for the key, 8 for the score and 4 for depth/flag/move/age
+ENTRY_SIZE = 20
+
+# packed data word: move in bits 0-14, flag 15-16, depth 17-24, age 25-30
+USED = 1 << 31
+
+def pack_move(move):
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def unpack_move(packed):
+    if packed == 0:
+        return None
+    return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+def table_slots(size_mb):
+    """Number of slots that fit in size_mb: two per bucket, a power of two buckets"""
+    entries = max(2, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+    return 2 << ((entries // 2).bit_length() - 1)
+
+class TranspositionTable:
+    """Fixed size table of search results, keyed by Zobrist hash.
+
+    Every bucket has two slots: the first keeps the deepest result seen for
+    the current search, the second is always replaced. Entries are stored
+    column by column in one flat buffer, so the memory used never changes
+    after the table is created.
+    """
+
+    def __init__(self, size_mb=16):
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        self.size_mb = size_mb
+        self.attach(bytearray(table_slots(size_mb) * ENTRY_SIZE))
+        self.generation = 0
+        self.reset_stats()
+
+    def attach(self, buffer, offset=0):
+        """Lay the key, score and data columns over buffer, starting at offset"""
+        self.slots = (len(buffer) - offset) // ENTRY_SIZE
+        self.mask = self.slots // 2 - 1
+        self.buffer = buffer
+
+        view = memoryview(buffer)[offset:offset + self.slots * ENTRY_SIZE]
+        self.keys = view[:self.slots * 8].cast("Q")
+        self.scores = view[self.slots * 8:self.slots * 16].cast("d")
+        self.data = view[self.slots * 16:].cast("I")
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        self.resize(self.size_mb)
+
+    def new_search(self):
+        """Age the table so results from older searches are replaced first"""
+        self.generation = (self.generation + 1) & 63
+
+    def __getstate__(self):
+        # only the size travels to other processes, they start with an empty table
+        return {"size_mb": self.size_mb}
+
+    def __setstate__(self, state):
+        self.resize(state["size_mb"])
+
+    def probe(self, key):
+        """Return (depth, score, flag, move) for key, or None"""
+        self.probes += 1
+        index = (key & self.mask) << 1
+        keys = self.keys
+
+        if keys[index] != key:
+            if keys[index + 1] != key:
+                if self.data[index] or self.data[index + 1]:
+                    self.collisions += 1
+                return None
+            index += 1
+
+        self.hits += 1
+        data = self.data[index]
+        return (data >> 17) & 255, self.scores[index], (data >> 15) & 3, unpack_move(data & 32767)
+
+    def store(self, key, depth, score, flag, move=None):
+        self.stores += 1
+        index = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+
+        if keys[index + 1] == key:
+            index += 1
+        elif keys[index] != key:
+            old = data[index]
+            # keep the deeper result from this search in the first slot, a result no deeper
+            # (every evaluation cache entry is depth 0) takes the second one
+            if old and ((old >> 25) & 63) == self.generation and ((old >> 17) & 255) >= depth:
+                index += 1
+
+        if data[index] and keys[index] != key:
+            self.overwrites += 1
+
+        keys[index] = key
+        self.scores[index] = score
+        data[index] = (
+            pack_move(move) | (flag << 15) | (min(max(depth, 0), 255) << 17) | (self.generation << 25) | USED
+        )
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def collision_rate(self):
+        return self.collisions / self.probes if self.probes else 0.0
+
+    def stats(self):
+        return {
+            "size_mb": self.size_mb,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "collisions": self.collisions,
+            "collision_rate": self.collision_rate(),
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
@@ -0,0 +1,99 @@
+import chess
+import chess.polyglot
+
+RANDOM_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_hasher = chess.polyglot.ZobristHasher(RANDOM_ARRAY)
+
+# PIECE_KEYS[color][piece_type][square], laid out the same way as polyglot
+PIECE_KEYS = [
+    [
+        [RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color) + sq] for sq in chess.SQUARES]
+        if piece_type else None
+        for piece_type in range(7)
+    ]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+def state_key(board):
+    """The part of the key that is not piece placement: castling, en passant and turn"""
+    return _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board) ^ _hasher.hash_turn(board)
+
+def touched_squares(board, move):
+    """Squares whose contents can change when move is played"""
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        return [chess.square(f, rank) for f in range(8)]
+    if board.is_en_passant(move):
+        return [move.from_square, move.to_square, move.to_square ^ 8]
+    return [move.from_square, move.to_square]
+
+class ZobristStack:
+    """Polyglot Zobrist keys of a board, updated on every push and pop.
+
+    Instead of hashing all 64 squares per node, only the squares touched by
+    the move and the castling/en passant/turn state are xored in and out.
+    The keys are identical to chess.polyglot.zobrist_hash, so book lookups
+    and stored table entries still match. Each push also records the
+    (square, old piece, new piece) changes so evaluations can be updated
+    incrementally too.
+    """
+
+    def __init__(self):
+        self.board = None
+        self.root_ply = 0
+        self.keys = []
+        self.changes = []
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def reset(self, board, key=None):
+        self.board = board
+        self.root_ply = len(board.move_stack)
+        self.keys = [chess.polyglot.zobrist_hash(board) if key is None else key]
+        self.changes = []
+
+    def in_sync(self, board):
+        return self.board is board and self.root_ply + len(self.changes) == len(board.move_stack)
+
+    def key(self, board):
+        if not self.in_sync(board):
+            self.reset(board)
+        return self.keys[-1]
+
+    def push(self, board, move):
+        if not self.in_sync(board):
+            self.reset(board)
+
+        squares = touched_squares(board, move)
+        before = [board.piece_at(sq) for sq in squares]
+        key = self.keys[-1] ^ state_key(board)
+
+        board.push(move)
+
+        changes = []
+        for sq, old in zip(squares, before):
+            new = board.piece_at(sq)
+            if old != new:
+                if old:
+                    key ^= PIECE_KEYS[old.color][old.piece_type][sq]
+                if new:
+                    key ^= PIECE_KEYS[new.color][new.piece_type][sq]
+                changes.append((sq, old, new))
+
+        self.keys.append(key ^ state_key(board))
+        self.changes.append(changes)
+        return changes
+
+    def pop(self, board):
+        if not self.in_sync(board) or not self.changes:
+            board.pop()
+            self.reset(board)
+            return None
+
+        board.pop()
+        self.keys.pop()
+        return self.changes.pop()
@@ -1,246 +1,468 @@
 import chess
-import random
 import base.ChessBotBase as ChessBotBase
+from base.EvalProfiler import EvalProfiler
+from base.OpeningBook import OpeningBook
+import json
 import math
 
+# summed distance from each square to the four central squares
+CENTER_DISTANCE = [
+    sum(chess.square_distance(sq, center) for center in (chess.E4, chess.E5, chess.D4, chess.D5))
+    for sq in chess.SQUARES
+]
+
+CENTER = chess.BB_E4 | chess.BB_E5 | chess.BB_D4 | chess.BB_D5
+
+VALUED_PIECES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+PIECE_VALUES = pawn_val, knight_val, bishop_val, rook_val, queen_val = 1, 3, 3.5, 5.5, 10
+
+# distance of the opponent king from the squares around e5/f5 it is driven away from
+KING_CENTER_DISTANCE = [
+    sum(chess.square_distance(sq, target) for target in (36, 37, 44, 45))
+    for sq in chess.SQUARES
+]
+
+# names of the values returned by Bot.features, in order
+FEATURES = (
+    "total_pieces", "my_material", "opponent_material",
+    "defended", "attacked", "attacking",
+    "center_distance", "center_control", "opp_center_control",
+    "opp_king_dist", "king_dists",
+    "pawn_distance", "coverage", "drawish",
+)
+DRAWISH = FEATURES.index("drawish")
+
+# names of the signed contributions returned by Bot.term_scores, which add up to the score
+TERMS = (
+    "material", "defended", "attacked", "attacking", "piece_count",
+    "center_distance", "center_control", "opp_king", "king_dists",
+    "coverage", "pawn_distance",
+)
+
+# weights of the evaluation terms; Tune.py fits them to game results and
+# writes a parameter file that params_path loads in their place
+DEFAULT_PARAMS = {
+    "defend_mod": 0.0075,
+    "attacked_mod": 0.0075,
+    "attack_mod": 0.005,
+    "opp_king_dist_mod": 0.03,
+    "distance_of_kings_mod": 0.06,
+    "pawn_distance_mod": 0.01,
+    "distance_from_center_mod": -0.0002,
+    "center_control_mod": 0.002,
+    "opp_center_control_mod": 0.0015,
+    "coverage_mod": 0.04,
+}
+
+def load_params(path):
+    """Modifiers from a parameter file written by Tune.py, with the defaults for any it leaves out"""
+    with open(path) as f:
+        data = json.load(f)
+    params = dict(DEFAULT_PARAMS)
+    for name, value in data["params"].items():
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"unknown evaluation parameter {name!r} in {path}")
+        params[name] = float(value)
+    return params
+
+
+def attack_counts(masks):
+    """Add attack masks up per square into bit-sliced counters (bit k of every square's count)"""
+    c0 = c1 = c2 = c3 = c4 = 0
+    for mask in masks:
+        carry = c0 & mask
+        c0 ^= mask
+        if carry:
+            carry, c1 = c1 & carry, c1 ^ carry
+            if carry:
+                carry, c2 = c2 & carry, c2 ^ carry
+                if carry:
+                    carry, c3 = c3 & carry, c3 ^ carry
+                    c4 |= carry
+    return c0, c1, c2, c3, c4
+
+def count_in(counts, targets):
+    """Total of the per-square counts over the target squares"""
+    c0, c1, c2, c3, c4 = counts
+    total = chess.popcount(c0 & targets)
+    if c1:
+        total += 2 * chess.popcount(c1 & targets)
+    if c2:
+        total += 4 * chess.popcount(c2 & targets)
+    if c3 or c4:
+        total += 8 * chess.popcount(c3 & targets) + 16 * chess.popcount(c4 & targets)
+    return total
+
+# replies played from the built-in book when no book file is given, keyed by the moves so far
+BUILTIN_BOOK = OpeningBook(lines={
+    "": [("e2e4", 1), ("d2d4", 1), ("c2c4", 1), ("g1f3", 1), ("b1c3", 1)],
+    "e2e4": [("e7e5", 1)],
+    "e2e3": [("e7e5", 1)],
+    "d2d4": [("d7d5", 1)],
+    "g1f3": [("c7c5", 1)],
+    "b1c3": [("d7d5", 1)],
+    "d2d3": [("e7e5", 1)],
+    "f2f4": [("g8f6", 1)],
+    "c2c4": [("e7e5", 1)],
+    "b2b3": [("e7e5", 1)],
+})
+
+# accumulator layout: piece counts at color * 7 + piece_type, then the two positional sums
+CENTER_SUM = 14
+PAWN_ADVANCE_SUM = 15
+
 class Bot(ChessBotBase.Bot):
+    def __init__(self, *args, incremental=True, profile=False, params_path=None, **kwargs):
+        # before the base class sets up its tables, whose cache_version depends on them
+        self.params = load_params(params_path) if params_path else dict(DEFAULT_PARAMS)
+        super().__init__(*args, **kwargs)
+        # time every evaluation section and keep every term's contribution, see EvalProfiler
+        self.profiler = EvalProfiler() if profile else None
+        # keep the additive evaluation terms updated on push/pop during search
+        self.incremental = incremental
+        self._acc = None
+        self._acc_board = None
+        self._acc_ply = 0
+
     def name(self):
         return "Complex Chess Bot"
 
-    def openning(self, board):
-        fen = str(board.fen().split(" ")[0])
-        move = None
-        if self.turn > 1:
-            return None
-        if fen == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR": #empty
-            move = ["e2e4", "d2d4", "c2c4", "g1f3", "b1c3"][random.randint(0, 4)]
-        elif fen == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR": #e4
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/4P3/PPPP1PPP/RNBQKBNR": #e3
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR": #d4
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R": #Nf3
-            move = "c7c5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/2N5/PPPPPPPP/R1BQKBNR": #Nc3
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/3P4/PPP1PPPP/RNBQKBNR": #d3
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/5P2/8/PPPPP1PP/RNBQKBNR": #f4
-            move = "g8f6"
-        elif fen == "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR": #c4
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/1P6/P1PPPPPP/RNBQKBNR": #b3
-            move = "e7e5"
-        elif self.turn == 1:
-            move = "e7e5"
-        if move == None:
-            return None
-        return chess.Move.from_uci(move)
-            
-
-    def evaluate(self, board):
-
-        if board.is_checkmate():
-            return -math.inf if board.turn == self.color else math.inf
-        
-        score = 0
-
-        # ------------------- MODIFIERS ------------------
+    def cache_version(self):
+        # fitted parameters score positions differently, so they get their own cache entries
+        return f"{super().cache_version()}|{json.dumps(self.params, sort_keys=True)}"
 
-        pawn_val, knight_val, bishop_val, rook_val, queen_val = 1, 3, 3.5, 5.5, 10
+    # ------------------ INCREMENTAL TERMS ------------------
 
-        defend_mod = 0.0075
-        attacked_mod = 0.0075
-        attack_mod = 0.005
-        
-        king_walk_mod = 0.02
-        opp_king_dist_mod = 0.03
-        distance_of_kings_mod = 0.06
-
-        pawn_distance_mod = 0.01
+    def pawn_advance(self, sq):
+        if self.color == chess.WHITE:
+            return chess.square_rank(sq)
+        return 8 - chess.square_rank(sq)
+
+    def accumulate(self, board):
+        """Piece counts, my pieces' summed center distance and my pawns' summed advance, from scratch"""
+        acc = [0] * 16
+        for color in chess.COLORS:
+            for piece_type in chess.PIECE_TYPES:
+                acc[color * 7 + piece_type] = chess.popcount(board.pieces_mask(piece_type, color))
+        for sq in chess.scan_reversed(board.occupied_co[self.color]):
+            acc[CENTER_SUM] += CENTER_DISTANCE[sq]
+        for sq in chess.scan_reversed(board.pawns & board.occupied_co[self.color]):
+            acc[PAWN_ADVANCE_SUM] += self.pawn_advance(sq)
+        return acc
+
+    def update_accumulator(self, acc, changes, sign):
+        for sq, old, new in changes:
+            for piece, delta in ((old, -sign), (new, sign)):
+                if piece is None:
+                    continue
+                acc[piece.color * 7 + piece.piece_type] += delta
+                if piece.color == self.color:
+                    acc[CENTER_SUM] += CENTER_DISTANCE[sq] * delta
+                    if piece.piece_type == chess.PAWN:
+                        acc[PAWN_ADVANCE_SUM] += self.pawn_advance(sq) * delta
+
+    def accumulator_in_sync(self, board):
+        return self._acc is not None and self._acc_board is board and self._acc_ply == len(board.move_stack)
+
+    def push(self, board, move):
+        in_sync = self.incremental and self.accumulator_in_sync(board)
+        changes = super().push(board, move)
+        if in_sync:
+            self.update_accumulator(self._acc, changes, 1)
+            self._acc_ply += 1
+        else:
+            self._acc = None
+        return changes
+
+    def pop(self, board):
+        in_sync = self.incremental and self.accumulator_in_sync(board)
+        changes = super().pop(board)
+        if in_sync and changes is not None:
+            self.update_accumulator(self._acc, changes, -1)
+            self._acc_ply -= 1
+        else:
+            self._acc = None
+        return changes
+
+    def terms(self, board):
+        """Accumulated terms for board, rebuilt only for the board being searched"""
+        if not self.incremental:
+            return self.accumulate(board)
+        if self.accumulator_in_sync(board):
+            return self._acc
+        acc = self.accumulate(board)
+        # boards from other callers (e.g. the GUI) must not clobber the search's accumulator
+        if self.hashes.in_sync(board):
+            self._acc = acc
+            self._acc_board = board
+            self._acc_ply = len(board.move_stack)
+        return acc
 
-        distance_from_center_mod = -0.0002
-        center_control_mod = 0.002
-        opp_center_control_mod = 0.0015
+    def openning(self, board):
+        # a book file given through book_path takes over from the built-in lines
+        if self.book is not None:
+            return super().openning(board)
+        move = BUILTIN_BOOK.choose(board)
+        # outside the lines, a bot that has searched one move plays e7e5, choose_move drops it if illegal
+        if move is None and self.turn == 1:
+            move = chess.Move.from_uci("e7e5")
+        return move
+            
 
-        coverage_mod = 0.04
+    # ------------------ EVALUATION ------------------
+    # evaluate() is split into features(), the raw per-position quantities,
+    # and combine(), which weighs them. combine() only uses arithmetic that
+    # works the same on floats and on NumPy columns, which is how Tune.py
+    # scores a whole matrix of positions at once.
 
-        # ----------------- GAME PROGRESSION BONUSES -----------------
+    def features(self, board):
+        """Raw evaluation quantities of a position that is not checkmate, see FEATURES"""
 
         total_pieces = chess.popcount(board.occupied)
 
-        beginning_bonus = 2 - min(total_pieces / 16, 1)
-        middlegame_bonus = 2 - min(2 * abs(total_pieces / 16 - 1), 1)
-        endgame_bonus = 1 + max(total_pieces / 16 - 1, 0)
-        
         # ---------------- MATERIAL -----------------
+        acc = self.terms(board)
+        me = self.color * 7
+        opp = (not self.color) * 7
+
         my_material = (
-            len(board.pieces(chess.PAWN, self.color)) * pawn_val +
-            len(board.pieces(chess.KNIGHT, self.color)) * knight_val +
-            len(board.pieces(chess.BISHOP, self.color)) * bishop_val +
-            len(board.pieces(chess.ROOK, self.color)) * rook_val +
-            len(board.pieces(chess.QUEEN, self.color)) * queen_val
+            acc[me + chess.PAWN] * pawn_val +
+            acc[me + chess.KNIGHT] * knight_val +
+            acc[me + chess.BISHOP] * bishop_val +
+            acc[me + chess.ROOK] * rook_val +
+            acc[me + chess.QUEEN] * queen_val
         )
         
         opponent_material = (
-            len(board.pieces(chess.PAWN, not self.color)) * pawn_val +
-            len(board.pieces(chess.KNIGHT, not self.color)) * knight_val +
-            len(board.pieces(chess.BISHOP, not self.color)) * bishop_val +
-            len(board.pieces(chess.ROOK, not self.color)) * rook_val +
-            len(board.pieces(chess.QUEEN, not self.color)) * queen_val
+            acc[opp + chess.PAWN] * pawn_val +
+            acc[opp + chess.KNIGHT] * knight_val +
+            acc[opp + chess.BISHOP] * bishop_val +
+            acc[opp + chess.ROOK] * rook_val +
+            acc[opp + chess.QUEEN] * queen_val
         )
 
-        material_score = (my_material - opponent_material) / middlegame_bonus + (my_material / opponent_material)
+        prof = self.profiler
+        if prof:
+            prof.lap("material")
+
+        # ---------------- ATTACK MAPS -----------------
+        # one attack map per side, shared by every attack based term
+
+        my_attacks = attack_counts([board.attacks_mask(sq) for sq in chess.scan_reversed(board.occupied_co[self.color])])
+        opp_attacks = attack_counts([board.attacks_mask(sq) for sq in chess.scan_reversed(board.occupied_co[not self.color])])
+
+        if prof:
+            prof.lap("attack_maps")
 
         # ---------------- ATTACKERS/DEFENDERS -----------------
 
-        king_squares = list(board.pieces(chess.KING, self.color))
-        queen_squares = list(board.pieces(chess.QUEEN, self.color))
-        rook_squares = list(board.pieces(chess.ROOK, self.color))
-        bishop_squares = list(board.pieces(chess.BISHOP, self.color))
-        knight_squares = list(board.pieces(chess.KNIGHT, self.color))
-        pawn_squares = list(board.pieces(chess.PAWN, self.color))
+        defended = 0
+        attacked = 0
 
-        # Combine all lists of squares
-        piece_pos = king_squares + queen_squares + rook_squares + bishop_squares + knight_squares + pawn_squares
+        for value, piece_type in zip(PIECE_VALUES, VALUED_PIECES):
+            targets = board.pieces_mask(piece_type, self.color)
+            if targets:
+                defended += count_in(my_attacks, targets) * value
+                attacked += count_in(opp_attacks, targets) * value
 
-        defended_score = 0
-        attacked_score = 0
+        if prof:
+            prof.lap("defenders")
 
-        for target_square in pawn_squares:
-            defended_score += len(board.attackers(self.color, target_square)) * pawn_val * defend_mod
-            attacked_score += len(board.attackers(not self.color, target_square)) * pawn_val * attacked_mod
+        # ---------------- ATTACKING -----------------
 
-        for target_square in knight_squares:
-            defended_score += len(board.attackers(self.color, target_square)) * knight_val * defend_mod
-            attacked_score += len(board.attackers(not self.color, target_square)) * knight_val * attacked_mod
+        attacking = 0
 
-        for target_square in bishop_squares:
-            defended_score += len(board.attackers(self.color, target_square)) * bishop_val * defend_mod
-            attacked_score += len(board.attackers(not self.color, target_square)) * bishop_val * attacked_mod
+        for value, piece_type in zip(PIECE_VALUES, VALUED_PIECES):
+            targets = board.pieces_mask(piece_type, not self.color)
+            if targets:
+                attacking += count_in(my_attacks, targets) * value
 
-        for target_square in rook_squares:
-            defended_score += len(board.attackers(self.color, target_square)) * rook_val * defend_mod
-            attacked_score += len(board.attackers(not self.color, target_square)) * rook_val * attacked_mod
+        if prof:
+            prof.lap("attacking")
 
-        for target_square in queen_squares:
-            defended_score += len(board.attackers(self.color, target_square)) * queen_val * defend_mod
-            attacked_score += len(board.attackers(not self.color, target_square)) * queen_val * attacked_mod
+        # -------------- CENTRAL CONTROL ------------------
 
-        # ---------------- ATTACKING -----------------
+        center_control = count_in(my_attacks, CENTER)
+        opp_center_control = count_in(opp_attacks, CENTER)
 
-        opp_king_squares = list(board.pieces(chess.KING, not self.color))
-        opp_queen_squares = list(board.pieces(chess.QUEEN, not self.color))
-        opp_rook_squares = list(board.pieces(chess.ROOK, not self.color))
-        opp_bishop_squares = list(board.pieces(chess.BISHOP, not self.color))
-        opp_knight_squares = list(board.pieces(chess.KNIGHT, not self.color))
-        opp_pawn_squares = list(board.pieces(chess.PAWN, not self.color))
+        if prof:
+            prof.lap("center")
 
-        # Combine all lists of squares
-        opp_piece_pos = opp_king_squares + opp_queen_squares + opp_rook_squares + opp_bishop_squares + opp_knight_squares + opp_pawn_squares
+        # ------------------ KINGS -------------------
 
-        attacker_score = 0
+        king = board.king(self.color)
+        opp_king = board.king(not self.color)
 
-        for target_square in opp_pawn_squares:
-            attacker_score += len(board.attackers(self.color, target_square)) * pawn_val * attack_mod
+        if prof:
+            prof.lap("kings")
 
-        for target_square in opp_knight_squares:
-            attacker_score += len(board.attackers(self.color, target_square)) * knight_val * attack_mod
+        # -------------------- MOVEMENT ------------------------
 
-        for target_square in opp_bishop_squares:
-            attacker_score += len(board.attackers(self.color, target_square)) * bishop_val * attack_mod
+        # every square with a nonzero count
+        attack_squares = 0
 
-        for target_square in opp_rook_squares:
-            attacker_score += len(board.attackers(self.color, target_square)) * rook_val * attack_mod
+        for plane in my_attacks:
+            attack_squares |= plane
 
-        for target_square in opp_queen_squares:
-            attacker_score += len(board.attackers(self.color, target_square)) * queen_val * attack_mod
+        coverage = chess.popcount(attack_squares)
 
-        
+        if prof:
+            prof.lap("movement")
 
-        # -------------- CENTRAL CONTROL ------------------
+        drawish = board.is_stalemate() or board.is_insufficient_material()
 
-        distance_score = 0
+        if prof:
+            prof.lap("drawish")
 
-        for pos in piece_pos:
-            dist = chess.square_distance(pos, chess.E4)
-            dist += chess.square_distance(pos, chess.E5)
-            dist += chess.square_distance(pos, chess.D4)
-            dist += chess.square_distance(pos, chess.D5)
-            distance_score += dist * distance_from_center_mod * beginning_bonus * middlegame_bonus
+        return (
+            total_pieces, my_material, opponent_material,
+            defended, attacked, attacking,
+            acc[CENTER_SUM], center_control, opp_center_control,
+            KING_CENTER_DISTANCE[opp_king], chess.square_distance(king, opp_king),
+            acc[PAWN_ADVANCE_SUM], coverage, drawish
+        )
 
-        central_control = len(board.attackers(self.color, chess.E4)) * center_control_mod
-        central_control += len(board.attackers(self.color, chess.E5)) * center_control_mod
-        central_control += len(board.attackers(self.color, chess.D4)) * center_control_mod
-        central_control += len(board.attackers(self.color, chess.D5)) * center_control_mod
+    def combine(self, f, minimum=min, maximum=max):
+        """Score from features() output; f may also be a sequence of NumPy columns"""
+        return sum(self.term_scores(f, minimum, maximum))
 
-        central_control -= len(board.attackers(not self.color, chess.E4)) * opp_center_control_mod
-        central_control -= len(board.attackers(not self.color, chess.E5)) * opp_center_control_mod
-        central_control -= len(board.attackers(not self.color, chess.D4)) * opp_center_control_mod
-        central_control -= len(board.attackers(not self.color, chess.D5)) * opp_center_control_mod
+    def term_scores(self, f, minimum=min, maximum=max, params=None):
+        """What each evaluation term adds to the score, in the order of TERMS, weighed by params or self.params"""
 
-        central_control *= beginning_bonus
+        (total_pieces, my_material, opponent_material,
+         defended, attacked, attacking,
+         center_distance, center_control, opp_center_control,
+         opp_king_dist, king_dists,
+         pawn_distance, coverage, drawish) = f
 
-        # ------------------ KING WALKING -------------------
+        # ------------------- MODIFIERS ------------------
+        # every term is linear in its modifiers, which is what lets Tune.py fit them
 
-        king_walk_score = 0
+        p = self.params if params is None else params
 
-        if self.color == chess.WHITE:
-            king_walk_score += chess.square_rank(king_squares[0])
-        else:
-            king_walk_score += 8 - chess.square_rank(king_squares[0])
+        defend_mod = p["defend_mod"]
+        attacked_mod = p["attacked_mod"]
+        attack_mod = p["attack_mod"]
 
-        king_walk_score *= king_walk_mod * ((endgame_bonus ** 2) - (beginning_bonus ** 2) - 1)
-        
+        opp_king_dist_mod = p["opp_king_dist_mod"]
+        distance_of_kings_mod = p["distance_of_kings_mod"]
 
-        # ----------------- CHECKMATING --------------------
+        pawn_distance_mod = p["pawn_distance_mod"]
 
-        opp_king_dist = chess.square_distance(opp_king_squares[0], 36)
-        opp_king_dist += chess.square_distance(opp_king_squares[0], 37)
-        opp_king_dist += chess.square_distance(opp_king_squares[0], 44)
-        opp_king_dist += chess.square_distance(opp_king_squares[0], 45)
+        distance_from_center_mod = p["distance_from_center_mod"]
+        center_control_mod = p["center_control_mod"]
+        opp_center_control_mod = p["opp_center_control_mod"]
 
-        king_dists = chess.square_distance(opp_king_squares[0], king_squares[0])
-        
-        opp_king_score = opp_king_dist * opp_king_dist_mod * max(0, endgame_bonus - 1.7)
+        coverage_mod = p["coverage_mod"]
 
-        king_dists_score = king_dists * distance_of_kings_mod * max(0, endgame_bonus - 1.7)
+        # ----------------- GAME PROGRESSION BONUSES -----------------
 
-        # ---------------- PAWN STRUCTURE ------------------
+        beginning_bonus = 2 - minimum(total_pieces / 16, 1)
+        middlegame_bonus = 2 - minimum(2 * abs(total_pieces / 16 - 1), 1)
+        endgame_bonus = 1 + maximum(total_pieces / 16 - 1, 0)
+
+        # ---------------- MATERIAL -----------------
+
+        material_score = (my_material - opponent_material) / middlegame_bonus + (my_material / maximum(opponent_material, 1))
+
+        # ---------------- ATTACKERS/DEFENDERS -----------------
+
+        defended_score = defended * defend_mod
+        attacked_score = attacked * attacked_mod
+
+        # ---------------- ATTACKING -----------------
 
-        pawn_distance = 0
+        attacker_score = attacking * attack_mod
 
-        for pawn in pawn_squares:
-            if self.color == chess.WHITE:
-                pawn_distance += chess.square_rank(pawn)
-            else:
-                pawn_distance += 8 - chess.square_rank(pawn)
+        # -------------- CENTRAL CONTROL ------------------
+
+        distance_score = center_distance * distance_from_center_mod * beginning_bonus * middlegame_bonus
+
+        central_control = center_control * center_control_mod
+        central_control -= opp_center_control * opp_center_control_mod
+
+        central_control *= beginning_bonus
+
+        # ----------------- CHECKMATING --------------------
+
+        opp_king_score = opp_king_dist * opp_king_dist_mod * maximum(0, endgame_bonus - 1.7)
+
+        king_dists_score = king_dists * distance_of_kings_mod * maximum(0, endgame_bonus - 1.7)
+
+        # ---------------- PAWN STRUCTURE ------------------
 
         pawn_distance_score = pawn_distance * pawn_distance_mod * beginning_bonus
 
         # -------------------- MOVEMENT ------------------------
 
-        attack_squares = set()
+        coverage_score = coverage * coverage_mod * middlegame_bonus * beginning_bonus
 
-        for sq, piece in board.piece_map().items():
-            if piece.color == self.color:
-                attack_squares |= set(board.attacks(sq))
+        # ----------------------- SCORING ------------------------
 
-        coverage_score = len(attack_squares) * coverage_mod * middlegame_bonus * beginning_bonus
+        return (
+            material_score, defended_score, -attacked_score, attacker_score,
+            total_pieces * (middlegame_bonus - 1), -distance_score, central_control,
+            opp_king_score, -king_dists_score, coverage_score, pawn_distance_score
+        )
 
-        # ----------------------- SCORING ------------------------
+    def evaluate(self, board):
+        prof = self.profiler
+        if prof:
+            prof.start()
 
-        score = (material_score + defended_score - attacked_score + attacker_score)
-        
-        score += (total_pieces * (middlegame_bonus - 1)) - distance_score
+        if board.is_checkmate():
+            return -math.inf if board.turn == self.color else math.inf
 
-        score += opp_king_score - king_dists_score + coverage_score + pawn_distance_score
+        if prof:
+            prof.lap("checkmate")
 
-        score += central_control
+        f = self.features(board)
+
+        if prof:
+            terms = self.term_scores(f)
+            score = sum(terms)
+            prof.lap("combine")
+            prof.record(TERMS, terms)
+        else:
+            score = self.combine(f)
 
-        if board.is_stalemate() or board.is_insufficient_material():
+        if f[DRAWISH]:
             return -score / 8
 
         return score
 
+    # ------------------ BATCHED LEAVES ------------------
+
+    def collect_leaf(self, board):
+        if self.profiler:
+            self.profiler.start()
+        if board.is_checkmate():
+            self._leaf_batch.append(-math.inf if board.turn == self.color else math.inf)
+        else:
+            if self.profiler:
+                self.profiler.lap("checkmate")
+            self._leaf_batch.append(self.features(board))
+
+    def evaluate_batch(self):
+        leaves = self._leaf_batch
+        self._leaf_batch = []
+
+        # checkmates are scored already, the rest are feature tuples
+        rows = [leaf for leaf in leaves if type(leaf) is tuple]
+
+        prof = self.profiler
+        if prof:
+            prof.start()
+
+        # the search's batches are mostly a leaf or two, too small for NumPy to win anything
+        terms = [self.term_scores(f) for f in rows]
+        scores = [sum(t) for t in terms]
+        scores = [-score / 8 if f[DRAWISH] else score for f, score in zip(rows, scores)]
+        terms = list(zip(*terms))
+
+        if prof and rows:
+            prof.lap("combine", len(rows))
+            prof.record(TERMS, terms)
+
+        scores = iter(scores)
+        return [next(scores) if type(leaf) is tuple else leaf for leaf in leaves]
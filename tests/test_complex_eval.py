@@ -0,0 +1,71 @@
+import random
+
+import chess
+import pytest
+
+import bots.ComplexChessBot as ComplexChessBot
+from bots.ComplexChessBot import FEATURES, PIECE_VALUES, VALUED_PIECES, attack_counts, count_in
+from Benchmark import BENCH_FENS
+
+# the bench positions plus en passant, promotion, castling and bare king cases
+CORPUS = BENCH_FENS + [
+    chess.STARTING_FEN,
+    "8/8/8/2k5/3pP3/8/8/4K3 b - e3 0 1",
+    "r3k2r/pPppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/1PPBBPPP/R3K2R w KQkq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 1",
+    "Q6k/8/6K1/8/8/8/8/8 b - - 0 1",
+]
+
+def reference_attack_terms(board, color):
+    """The attack based features as evaluate computed them before the bitboard rewrite, square by square"""
+    defended = attacked = attacking = 0
+    for value, piece_type in zip(PIECE_VALUES, VALUED_PIECES):
+        for square in board.pieces(piece_type, color):
+            defended += len(board.attackers(color, square)) * value
+            attacked += len(board.attackers(not color, square)) * value
+        for square in board.pieces(piece_type, not color):
+            attacking += len(board.attackers(color, square)) * value
+
+    center = (chess.E4, chess.E5, chess.D4, chess.D5)
+    center_control = sum(len(board.attackers(color, square)) for square in center)
+    opp_center_control = sum(len(board.attackers(not color, square)) for square in center)
+
+    covered = set()
+    for square in chess.SquareSet(board.occupied_co[color]):
+        covered |= set(board.attacks(square))
+
+    return {
+        "defended": defended, "attacked": attacked, "attacking": attacking,
+        "center_control": center_control, "opp_center_control": opp_center_control,
+        "coverage": len(covered),
+    }
+
+@pytest.mark.parametrize("color", chess.COLORS)
+@pytest.mark.parametrize("fen", CORPUS)
+def test_attack_terms_match_reference(fen, color):
+    board = chess.Board(fen)
+    bot = ComplexChessBot.Bot(color=color, hash_mb=1, stats=False)
+    features = dict(zip(FEATURES, bot.features(board)))
+    for name, value in reference_attack_terms(board, color).items():
+        assert features[name] == pytest.approx(value), name
+
+@pytest.mark.parametrize("color", chess.COLORS)
+@pytest.mark.parametrize("fen", CORPUS)
+def test_incremental_and_scratch_scores_agree(fen, color):
+    board = chess.Board(fen)
+    incremental = ComplexChessBot.Bot(color=color, hash_mb=1, stats=False)
+    scratch = ComplexChessBot.Bot(color=color, hash_mb=1, stats=False, incremental=False)
+    assert incremental.evaluate(board) == scratch.evaluate(board)
+
+def test_attack_counts_match_naive_counts():
+    rng = random.Random(7)
+    for _ in range(200):
+        # up to 31 overlapping masks, the most a 5 bit counter holds
+        masks = [rng.getrandbits(64) & rng.getrandbits(64) for _ in range(rng.randint(0, 31))]
+        targets = rng.getrandbits(64)
+        counts = attack_counts(masks)
+        expected = sum(chess.popcount(mask & targets) for mask in masks)
+        assert count_in(counts, targets) == expected
+        for square in chess.SQUARES:
+            assert count_in(counts, chess.BB_SQUARES[square]) == sum(mask >> square & 1 for mask in masks)
@@ -0,0 +1,27 @@
+import chess
+
+import bots.ComplexChessBot as ComplexChessBot
+
+def test_builtin_lines_and_fallback():
+    bot = ComplexChessBot.Bot(color=chess.BLACK, hash_mb=1, stats=False)
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert bot.openning(board) == chess.Move.from_uci("e7e5")
+
+    # not in the lines: searched on the first move, e7e5 once a move has been searched
+    board = chess.Board()
+    board.push_uci("h2h3")
+    assert bot.openning(board) is None
+    bot.turn = 1
+    assert bot.openning(board) == chess.Move.from_uci("e7e5")
+    bot.turn = 2
+    assert bot.openning(board) is None
+
+def test_fallback_is_searched_over_when_illegal():
+    bot = ComplexChessBot.Bot(color=chess.WHITE, depth=1, hash_mb=1, stats=False)
+    bot.turn = 1
+    board = chess.Board()
+    board.push_uci("g1f3")
+    board.push_uci("g8f6")
+    move, _ = bot.choose_move(board)
+    assert board.is_legal(move)
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+from base.PersistentTable import PersistentTable, HEADER, HEADER_SIZE, MAGIC, FORMAT
+from base.TranspositionTable import ENTRY_SIZE, EXACT, LOWER
+
+KEY = 0x123456789ABCDEF
+
+def probe_in_new_process(path, version, key):
+    table = PersistentTable(path, 1, version)
+    try:
+        return table.probe(key)
+    finally:
+        table.close()
+
+def store_in_new_process(path, version, key, score):
+    table = PersistentTable(path, 1, version)
+    table.store(key, 5, score, LOWER, chess.Move.from_uci("e2e4"))
+    table.close()
+
+def search_with_cache(cache_path, fen):
+    import bots.ComplexChessBot as ComplexChessBot
+    board = chess.Board(fen)
+    bot = ComplexChessBot.Bot(color=board.turn, depth=2, hash_mb=1, cache_path=cache_path)
+    move, _ = bot.choose_move(board)
+    bot.close()
+    return move.uci()
+
+def spawn_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def test_new_file_has_header_at_start(tmp_path):
+    path = str(tmp_path / "table.tt")
+    table = PersistentTable(path, 1, "v")
+    table.close()
+
+    with open(path, "rb") as f:
+        magic, file_format, slots, _ = HEADER.unpack(f.read(HEADER.size))
+    assert (magic, file_format) == (MAGIC, FORMAT)
+    assert os.path.getsize(path) == HEADER_SIZE + slots * ENTRY_SIZE
+
+def test_entry_read_back_by_another_process(tmp_path):
+    path = str(tmp_path / "table.tt")
+    table = PersistentTable(path, 1, "v")
+    table.store(KEY, 3, 1.25, EXACT, chess.Move.from_uci("g1f3"))
+
+    with spawn_pool(1) as pool:
+        entry = pool.submit(probe_in_new_process, path, "v", KEY).result()
+        other_version = pool.submit(probe_in_new_process, path, "w", KEY).result()
+    table.close()
+
+    assert entry == (3, 1.25, EXACT, chess.Move.from_uci("g1f3"))
+    assert other_version is None
+
+def test_reopening_keeps_entries_from_other_processes(tmp_path):
+    path = str(tmp_path / "table.tt")
+    with spawn_pool(1) as pool:
+        pool.submit(store_in_new_process, path, "v", KEY, -0.5).result()
+
+    # a different size request must not resize or clear the existing file
+    table = PersistentTable(path, 4, "v")
+    assert table.probe(KEY) == (5, -0.5, LOWER, chess.Move.from_uci("e2e4"))
+    table.close()
+
+def test_older_format_is_cleared_in_place(tmp_path):
+    path = str(tmp_path / "table.tt")
+    size = HEADER_SIZE + 1000 * ENTRY_SIZE
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT - 1, 1000, 0) + b"\xff" * (size - HEADER.size))
+
+    table = PersistentTable(path, 1, "v")
+    assert table.probe(KEY) is None
+    table.close()
+    # cleared, never cut short under another process' map
+    assert os.path.getsize(path) >= size
+    with open(path, "rb") as f:
+        assert HEADER.unpack(f.read(HEADER.size))[:2] == (MAGIC, FORMAT)
+
+def test_concurrent_bots_share_cache(tmp_path):
+    cache_path = str(tmp_path / "cache")
+    fens = [
+        chess.STARTING_FEN,
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+        "8/8/8/2k5/3pP3/8/8/4K3 b - e3 0 1",
+        "1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1",
+    ]
+    with spawn_pool(2) as pool:
+        moves = list(pool.map(search_with_cache, [cache_path] * len(fens), fens))
+    assert all(moves)
+
+    # the evaluation cache persisted too
+    for suffix in (".tt", ".eval"):
+        with open(cache_path + suffix, "rb") as f:
+            assert HEADER.unpack(f.read(HEADER.size))[:2] == (MAGIC, FORMAT)
+
+def test_search_settings_change_cache_version(tmp_path):
+    import bots.ComplexChessBot as ComplexChessBot
+    settings = [
+        {},
+        {"null_move": True},
+        {"lmr": True},
+        {"futility": True},
+        {"syzygy_path": str(tmp_path)},
+        {"syzygy_path": str(tmp_path), "syzygy_pieces": 4},
+    ]
+    versions = [ComplexChessBot.Bot(hash_mb=1, stats=False, **options).cache_version() for options in settings]
+    assert len(set(versions)) == len(versions)
+
+def test_depth_zero_results_fill_both_slots_of_a_bucket(tmp_path):
+    table = PersistentTable(str(tmp_path / "table.eval"), 1, "v")
+    other = KEY + (table.mask + 1)
+    table.store(KEY, 0, 1.5, EXACT)
+    table.store(other, 0, -2.0, EXACT)
+    assert table.probe(KEY) == (0, 1.5, EXACT, None)
+    assert table.probe(other) == (0, -2.0, EXACT, None)
+    table.close()
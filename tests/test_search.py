@@ -0,0 +1,107 @@
+import random
+from array import array
+
+import chess
+import pytest
+
+import bots.ComplexChessBot as ComplexChessBot
+from base.ChessBotBase import MAX_PLY
+
+def long_game(plies, seed=0):
+    """A board after plies random legal moves, without the game ending on the way"""
+    rng = random.Random(seed)
+    while True:
+        board = chess.Board()
+        while len(board.move_stack) < plies and not board.is_game_over(claim_draw=False):
+            board.push(rng.choice(list(board.legal_moves)))
+        if len(board.move_stack) == plies and not board.is_game_over():
+            return board
+
+def test_minimax_searches_from_a_long_game():
+    board = long_game(MAX_PLY + 12)
+    bot = ComplexChessBot.Bot(color=board.turn, hash_mb=1, stats=False)
+    score, best = bot.minimax(board, 2)
+    assert best is not None and board.is_legal(best[0])
+
+    # a root set by an earlier, longer search must not leave the plies negative;
+    # leaf scores carry a random tie-break below 0.001
+    bot.root_ply = len(board.move_stack) + 50
+    stale = ComplexChessBot.Bot(color=board.turn, hash_mb=1, stats=False)
+    assert bot.minimax(board, 2)[0] == pytest.approx(stale.minimax(board, 2)[0], abs=0.01)
+
+def test_minimax_matches_negamax_from_the_root():
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    bot = ComplexChessBot.Bot(color=chess.BLACK, hash_mb=1, stats=False)
+    other = ComplexChessBot.Bot(color=chess.BLACK, hash_mb=1, stats=False)
+    other.hashes.reset(board)
+    score, _ = bot.minimax(board, 2)
+    assert score == pytest.approx(-other.negamax(board, 2)[0], abs=0.01)
+
+def root_worker(bot, bound):
+    """Set this process up like a pool worker; tasks get board copies, as the pool pickles them"""
+    import multiprocessing
+    import threading
+    from base.ChessBotBase import _init_worker
+    shared = multiprocessing.Value("d", bound)
+    _init_worker(bot, shared, threading.Event())
+    return shared
+
+def test_root_worker_flags_fail_lows():
+    from base.ChessBotBase import _search_root_move
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    bot = ComplexChessBot.Bot(color=chess.WHITE, hash_mb=1, stats=False)
+    move = chess.Move.from_uci("a2a3")
+
+    # with no bound to beat the score is exact and becomes the bound
+    shared = root_worker(bot, -1e9)
+    score, fail_low, _, _ = _search_root_move(board.copy(), move, 3, None)
+    assert not fail_low and shared.value == score
+
+    # against a bound it can't reach, the score is only an upper bound and isn't published
+    shared = root_worker(bot, score + 1)
+    low_score, fail_low, _, _ = _search_root_move(board.copy(), move, 3, None)
+    assert fail_low and low_score <= score + 1 and shared.value == score + 1
+
+def test_root_workers_share_a_node_budget():
+    from base.ChessBotBase import _search_root_move
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    bot = ComplexChessBot.Bot(color=chess.WHITE, hash_mb=1, stats=False)
+    root_worker(bot, -1e9)
+    spent = 0
+    for move in list(board.legal_moves)[:8]:
+        score, _, nodes, _ = _search_root_move(board.copy(), move, 4, None, "search", 500)
+        spent += nodes
+    # the share covers the moves together, checked every 64 nodes
+    assert score is None and spent < 500 + 64 * 8
+
+def test_node_limit_holds_with_threads():
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    bot = ComplexChessBot.Bot(color=chess.WHITE, hash_mb=1, stats=False, threads=2)
+    try:
+        move, _ = bot.choose_move(board, node_limit=20000)
+    finally:
+        bot.close()
+    assert board.is_legal(move) and bot.nodes <= 20000 * 1.1
+
+class PawnRootBot(ComplexChessBot.Bot):
+    """Only considers pawn moves at the root, through the move generation hook"""
+
+    def generate_moves(self, board, ply, tt_move=None):
+        count = super().generate_moves(board, ply, tt_move)
+        if ply != 0:
+            return count
+        buffer = self.move_buffers[ply]
+        pawn_moves = [record for record in buffer[:count] if board.pawns & chess.BB_SQUARES[record & 63]]
+        buffer[:len(pawn_moves)] = array("q", pawn_moves)
+        return len(pawn_moves)
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_root_moves_come_from_generate_moves(threads):
+    # the knight takes a free queen, but only pawn moves are on offer
+    board = chess.Board("rnb1kbnr/pppp1ppp/8/4q3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 3")
+    bot = PawnRootBot(color=chess.WHITE, hash_mb=1, stats=False, threads=threads)
+    try:
+        _, best = bot.iterative_deepening(board, 3)
+    finally:
+        bot.close()
+    assert board.piece_type_at(best[0].from_square) == chess.PAWN
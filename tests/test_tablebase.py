@@ -0,0 +1,22 @@
+import chess
+import pytest
+
+import bots.ComplexChessBot as ComplexChessBot
+from base.Tablebase import Tablebase, TB_WIN
+
+def test_missing_directory_fails_at_construction(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Tablebase(str(tmp_path / "missing"))
+    with pytest.raises(FileNotFoundError):
+        ComplexChessBot.Bot(hash_mb=1, stats=False, syzygy_path=str(tmp_path / "missing"))
+
+@pytest.mark.parametrize("ply", [0, 1, 7, 40])
+def test_tablebase_scores_skip_the_aspiration_window(ply):
+    bot = ComplexChessBot.Bot(hash_mb=1, stats=False)
+    calls = []
+    bot.negamax = lambda board, *window: calls.append(window) or (0.0, None)
+    for score in (TB_WIN - ply, -TB_WIN + ply):
+        calls.clear()
+        bot.aspiration_search(chess.Board(), 2, score)
+        # one full window search, no window around the score first
+        assert calls == [(2,)]
@@ -0,0 +1,31 @@
+import chess
+
+from base.TranspositionTable import TranspositionTable, EXACT, LOWER
+
+def test_depth_zero_results_fill_both_slots_of_a_bucket():
+    table = TranspositionTable(1)
+    first = 0x123456789ABCDEF
+    # same bucket, different key
+    second = first + (table.mask + 1)
+    table.store(first, 0, 1.5, EXACT)
+    table.store(second, 0, -2.0, EXACT)
+    assert table.probe(first) == (0, 1.5, EXACT, None)
+    assert table.probe(second) == (0, -2.0, EXACT, None)
+
+    # the second slot is the one that is always replaced
+    third = second + (table.mask + 1)
+    table.store(third, 0, 3.0, EXACT)
+    assert table.probe(first) is not None and table.probe(second) is None
+
+def test_deeper_results_stay_in_the_first_slot():
+    table = TranspositionTable(1)
+    deep = 0xFEDCBA987654321
+    table.store(deep, 6, 0.5, LOWER, chess.Move.from_uci("e2e4"))
+    for i in range(1, 4):
+        table.store(deep + i * (table.mask + 1), 7 - i, float(i), EXACT)
+    assert table.probe(deep) == (6, 0.5, LOWER, chess.Move.from_uci("e2e4"))
+
+    # in a later search the old entry gives way
+    table.new_search()
+    table.store(deep + 9 * (table.mask + 1), 1, 9.0, EXACT)
+    assert table.probe(deep) is None
@@ -0,0 +1,56 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_engine():
+    """python UCI.py reading its commands from a pipe, and a queue of its output lines"""
+    engine = subprocess.Popen(
+        [sys.executable, "UCI.py"], cwd=ROOT, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    lines = queue.Queue()
+    threading.Thread(target=lambda: [lines.put(line.strip()) for line in engine.stdout], daemon=True).start()
+    return engine, lines
+
+def send(engine, *commands):
+    engine.stdin.write("".join(command + "\n" for command in commands))
+    engine.stdin.flush()
+
+def read_until(lines, prefix, timeout=60):
+    """Every output line up to and including the first one starting with prefix"""
+    read = []
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            line = lines.get(timeout=end - time.time())
+        except queue.Empty:
+            break
+        read.append(line)
+        if line.startswith(prefix):
+            return read
+    raise AssertionError(f"no {prefix!r} within {timeout}s, got {read}")
+
+def test_threads_search_while_stdin_is_read():
+    # the worker pool is started while the main thread is blocked reading the pipe
+    engine, lines = start_engine()
+    try:
+        send(engine, "uci", "setoption name Threads value 2", "position startpos moves e2e4 c7c5 g1f3", "go depth 3")
+        read = read_until(lines, "bestmove")
+        assert any(line.startswith("info depth 3") for line in read)
+
+        # a new game restarts the workers, again while stdin is being read
+        send(engine, "ucinewgame", "position startpos moves e2e4 c7c5 g1f3", "go infinite")
+        read_until(lines, "info depth 2")
+        send(engine, "stop")
+        read_until(lines, "bestmove", timeout=30)
+
+        send(engine, "quit")
+        assert engine.wait(timeout=30) == 0
+    finally:
+        if engine.poll() is None:
+            engine.kill()